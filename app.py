@@ -1,124 +1,254 @@
 # app.py
 import asyncio
+import gzip
+import threading
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 from flask import Flask, request, jsonify, render_template
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 import config
-from routing import fetch_route, decode_polyline, sample_waypoints, compute_etas, compute_adjusted_etas, build_station_aware_waypoints
-from weather_nws import fetch_nws_forecast, fetch_nws_alerts, find_forecast_for_time
-from weather_openmeteo import fetch_openmeteo, find_data_for_time as find_openmeteo_for_time
-from weather_tomorrow import fetch_tomorrow, find_data_for_time as find_tomorrow_for_time
-from road_conditions import fetch_chain_controls, fetch_rwis_stations, match_rwis_to_waypoint
-from assembler import merge_weather, build_segments, compute_weather_slowdown, classify_light_level
+from http_client import get_shared_session
+from routing import fetch_route, compute_etas, compute_adjusted_etas, route_waypoints
+from road_conditions import fetch_rwis_stations
+from assembler import compute_weather_slowdown
+from rest_stops import compute_rest_stop_positions, fetch_rest_stop_places
+from planner import (compute_slider_range, is_slider_slot, fetch_raw_weather, resolve_weather_for_etas,
+                     resolve_weather_only, build_slot_data, alert_active_at)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serialises with orjson (C-accelerated) instead of json."""
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.option)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
-from planner import compute_slider_range, fetch_raw_weather, resolve_weather_for_etas, build_slot_data
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
+# Long-lived event loop shared by all requests, so the pooled HTTP session
+# and async caches survive between requests.
+_loop = asyncio.new_event_loop()
+threading.Thread(target=_loop.run_forever, name="async-loop", daemon=True).start()
 
-@app.route("/api/route-weather")
-def route_weather():
-    origin = request.args.get("origin")
-    destination = request.args.get("destination")
-    departure_str = request.args.get("departure")
+
+def run_async(coro):
+    """Run a coroutine on the shared background loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+
+@app.after_request
+def compress_response(response):
+    """Compress large JSON responses with brotli or gzip, if the client accepts it."""
+    if (response.mimetype != "application/json"
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers):
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and "br" in accepted:
+        encoding = "br"
+    elif "gzip" in accepted:
+        encoding = "gzip"
+    else:
+        return response
+
+    data = response.get_data()
+    if len(data) < config.GZIP_MIN_BYTES:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=config.BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=config.GZIP_LEVEL))
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _parse_departure(value):
+    """Parse an ISO 8601 departure, assuming Pacific time when no offset is given."""
+    try:
+        departure = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("Invalid departure format. Use ISO 8601.")
+    # If no timezone provided (e.g. from datetime-local input), assume Pacific
+    if departure.tzinfo is None:
+        departure = departure.replace(tzinfo=ZoneInfo("America/Los_Angeles"))
+    return departure
+
+
+def _parse_trip_args(args):
+    """Validate the trip query params shared by the route-weather endpoints.
+
+    Raises ValueError with a user-facing message on bad input.
+    """
+    origin = args.get("origin")
+    destination = args.get("destination")
+    departure_str = args.get("departure")
 
     if not origin or not destination or not departure_str:
-        return jsonify({"error": "Missing required params: origin, destination, departure"}), 400
+        raise ValueError("Missing required params: origin, destination, departure")
 
     if len(origin) > 500 or len(destination) > 500:
-        return jsonify({"error": "origin/destination too long (max 500 chars)"}), 400
+        raise ValueError("origin/destination too long (max 500 chars)")
+
+    departure = _parse_departure(departure_str)
+
+    resolution = args.get("slider_resolution", "fine")
+    if resolution not in ("fine", "coarse"):
+        raise ValueError("slider_resolution must be 'fine' or 'coarse'")
+
+    return {
+        "origin": origin,
+        "destination": destination,
+        "departure": departure,
+        "resolution": resolution,
+        "speed_factor": max(0.5, min(1.0, float(args.get("speed_factor", "1.0")))),
+        "rest_enabled": args.get("rest_enabled", "false") == "true",
+        "rest_interval": max(30, min(180, int(args.get("rest_interval", "60")))),
+        "rest_duration": max(5, min(60, int(args.get("rest_duration", "20")))),
+    }
+
+
+async def _with_session(fetch, *args, **kwargs):
+    """Call an upstream fetcher with the shared pooled session."""
+    session = await get_shared_session()
+    return await fetch(*args, session=session, **kwargs)
 
+
+def prepare_trip(trip):
+    """Fetch route, waypoints, raw weather and rest stops for a trip.
+
+    Runs on the request thread: only the upstream fetches are handed to the
+    shared loop, so decoding, station snapping and the rest-stop ETA pass
+    don't hold up other requests' I/O. Route and weather fetches are
+    TTL-cached, so the per-slot endpoint can call this again cheaply for
+    the same trip.
+    """
+    departure = trip["departure"]
+    speed_factor = trip["speed_factor"]
+
+    route = run_async(_with_session(fetch_route, trip["origin"], trip["destination"], departure.isoformat()))
+    rwis_stations = run_async(_with_session(fetch_rwis_stations))
+    waypoints = route_waypoints(route["polyline"], rwis_stations)
+    raw_weather = run_async(_with_session(fetch_raw_weather, waypoints, rwis_stations=rwis_stations))
+
+    # Compute rest stop locations once for selected departure
+    rest_stop_info = None
+    if trip["rest_enabled"]:
+        initial_etas = compute_etas(waypoints, route["total_duration_seconds"], departure)
+        weather_data_init = resolve_weather_only(raw_weather, waypoints, initial_etas)
+        slowdowns = [compute_weather_slowdown(weather_data_init[i])
+                     for i in range(len(weather_data_init) - 1)]
+        adjusted_etas = compute_adjusted_etas(
+            waypoints, route["total_duration_seconds"], departure,
+            speed_factor, slowdowns)
+        positions = compute_rest_stop_positions(adjusted_etas, trip["rest_interval"])
+
+        if positions:
+            rest_stop_info = run_async(_with_session(fetch_rest_stop_places, positions, waypoints))
+
+    return route, waypoints, raw_weather, rest_stop_info
+
+
+@app.route("/api/route-weather")
+def route_weather():
     try:
-        departure = datetime.fromisoformat(departure_str)
-        # If no timezone provided (e.g. from datetime-local input), assume Pacific
-        if departure.tzinfo is None:
-            departure = departure.replace(tzinfo=ZoneInfo("America/Los_Angeles"))
-    except ValueError:
-        return jsonify({"error": "Invalid departure format. Use ISO 8601."}), 400
+        trip = _parse_trip_args(request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    departure = trip["departure"]
+    resolution = trip["resolution"]
 
-    now = datetime.now(tz=timezone.utc)
-    if departure < now - timedelta(minutes=5):
+    # Only the initial request needs a future departure; slot requests for
+    # the same trip keep working after it passes.
+    if departure < datetime.now(tz=timezone.utc) - timedelta(minutes=5):
         return jsonify({"error": "Departure time must be in the future."}), 400
 
-    speed_factor = max(0.5, min(1.0, float(request.args.get("speed_factor", "1.0"))))
-    rest_enabled = request.args.get("rest_enabled", "false") == "true"
-    rest_interval = max(30, min(180, int(request.args.get("rest_interval", "60"))))
-    rest_duration = max(5, min(60, int(request.args.get("rest_duration", "20"))))
-
-    async def do_work(speed_factor, rest_enabled, rest_interval, rest_duration):
-        import aiohttp
-
-        route = await fetch_route(origin, destination, departure.isoformat())
-        points = decode_polyline(route["polyline"])
-
-        # Fetch RWIS stations and raw weather via a single session
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
-            rwis_stations = await fetch_rwis_stations(session=session)
-            waypoints = build_station_aware_waypoints(points, rwis_stations)
-            raw_weather = await fetch_raw_weather(waypoints, session, rwis_stations=rwis_stations)
-
-        # Compute rest stop locations once for selected departure
-        rest_stop_info = None
-        if rest_enabled:
-            from rest_stops import compute_rest_stop_positions, fetch_rest_stop_places
-
-            initial_etas = compute_etas(waypoints, route["total_duration_seconds"], departure)
-            weather_data_init, _, _, _, _ = resolve_weather_for_etas(raw_weather, waypoints, initial_etas)
-            slowdowns = [compute_weather_slowdown(weather_data_init[i])
-                         for i in range(len(weather_data_init) - 1)]
-            adjusted_etas = compute_adjusted_etas(
-                waypoints, route["total_duration_seconds"], departure,
-                speed_factor, slowdowns)
-            positions = compute_rest_stop_positions(adjusted_etas, rest_interval)
-
-            if positions:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
-                    rest_stop_info = await fetch_rest_stop_places(positions, waypoints, session)
-
-        # Build selected slot
-        selected = build_slot_data(departure, waypoints, route, raw_weather,
-                                   speed_factor, rest_stop_info, rest_duration)
-
-        # Build all slider slots
-        now_local = datetime.now(tz=timezone.utc).astimezone(departure.tzinfo)
-        slot_times = compute_slider_range(departure, now_local)
-        slots = {}
-        for slot_dep in slot_times:
-            slots[slot_dep.isoformat()] = build_slot_data(
-                slot_dep, waypoints, route, raw_weather,
-                speed_factor, rest_stop_info, rest_duration)
-
-        total_miles = round(route["total_distance_meters"] / 1609.344, 1)
-        total_minutes = round(route["total_duration_seconds"] / 60)
-
-        return {
-            "route": {
-                "summary": route["summary"],
-                "total_distance_miles": total_miles,
-                "total_duration_minutes": total_minutes,
-                "departure": departure.isoformat(),
-                "arrival": selected["arrival"],
-                "polyline": route["polyline"],
-            },
-            "segments": selected["segments"],
-            "alerts": selected["alerts"],
-            "sources": raw_weather["sources"],
-            "slots": slots,
-            "slider_range": {
-                "min": slot_times[0].isoformat(),
-                "max": slot_times[-1].isoformat(),
-                "step_hours": 1,
-                "selected": departure.isoformat(),
-            },
-        }
+    try:
+        route, waypoints, raw_weather, rest_stop_info = prepare_trip(trip)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Slot building is CPU-only, so like prepare_trip's CPU steps it runs on
+    # the request thread, leaving the shared loop free for other requests' I/O.
+    # Other slider slots are served by /api/route-weather/slot.
+    selected = build_slot_data(departure, waypoints, route, raw_weather,
+                               trip["speed_factor"], rest_stop_info, trip["rest_duration"])
+
+    now_local = datetime.now(tz=timezone.utc).astimezone(departure.tzinfo)
+    slot_keys = [t.isoformat() for t in compute_slider_range(departure, now_local, resolution)]
+
+    total_miles = round(route["total_distance_meters"] / 1609.344, 1)
+    total_minutes = round(route["total_duration_seconds"] / 60)
+
+    return jsonify({
+        "route": {
+            "summary": route["summary"],
+            "total_distance_miles": total_miles,
+            "total_duration_minutes": total_minutes,
+            "departure": selected["departure"],
+            "arrival": selected["arrival"],
+            "polyline": route["polyline"],
+        },
+        "segments": selected["segments"],
+        "alerts": selected["alerts"],
+        "sources": raw_weather["sources"],
+        "slider_range": {
+            "min": slot_keys[0],
+            "max": slot_keys[-1],
+            "step_hours": 1 if resolution == "fine" else None,
+            "selected": selected["departure"],
+            "slots": slot_keys,
+        },
+    })
+
+
+@app.route("/api/route-weather/slot")
+def route_weather_slot():
+    """Build one slider slot on demand, reusing the cached route and weather."""
+    try:
+        trip = _parse_trip_args(request.args)
+        slot_str = request.args.get("slot")
+        if not slot_str:
+            raise ValueError("Missing required param: slot")
+        slot_departure = _parse_departure(slot_str)
+        if not is_slider_slot(trip["departure"], slot_departure, trip["resolution"]):
+            raise ValueError("slot must be one of the slider_range slots")
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     try:
-        result = asyncio.run(do_work(speed_factor, rest_enabled, rest_interval, rest_duration))
+        route, waypoints, raw_weather, rest_stop_info = prepare_trip(trip)
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
-    return jsonify(result)
+
+    return jsonify(build_slot_data(slot_departure, waypoints, route, raw_weather,
+                                   trip["speed_factor"], rest_stop_info, trip["rest_duration"]))
 
 
 @app.route("/")
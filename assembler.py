@@ -1,27 +1,67 @@
 # assembler.py
-from datetime import datetime, timedelta
-from routing import haversine_miles
-from road_conditions import match_chain_control_to_instruction
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from functools import lru_cache
+from config import SEVERITY_VISIBILITY, SEVERITY_WIND, SEVERITY_PRECIP
+from routing import segment_distances
+from road_conditions import build_cc_index, match_chain_control_to_instruction
+
+
+# Threshold ladders as sorted (keys, values) tables for bisect lookups.
+# Rain: mm/hr at or above each key moves up one label.
+_RAIN_KEYS = (0.1, 0.5, 4.0)
+_RAIN_LABELS = ("none", "light", "moderate", "heavy")
+
+# Fog: visibility above each key moves up one label.
+_FOG_KEYS = (1.0, 5.0)
+_FOG_LABELS = ("dense", "patchy", "none")
+
+# Visibility penalties apply below a threshold: bisect_right on the
+# ascending thresholds gives the first one the value is under.
+_VIS_KEYS = tuple(t for t, _ in SEVERITY_VISIBILITY)
+_VIS_PENALTIES = tuple(p for _, p in SEVERITY_VISIBILITY) + (0,)
+
+# Wind and precip penalties apply above a threshold. The config tables are
+# descending, so reverse them; bisect_left then counts thresholds exceeded.
+_WIND_KEYS = tuple(t for t, _ in reversed(SEVERITY_WIND))
+_WIND_PENALTIES = (0,) + tuple(p for _, p in reversed(SEVERITY_WIND))
+_PRECIP_KEYS = tuple(t for t, _ in reversed(SEVERITY_PRECIP))
+_PRECIP_PENALTIES = (0,) + tuple(p for _, p in reversed(SEVERITY_PRECIP))
+
+# RWIS pavement statuses are a small vocabulary; anything else scores 0.
+_PAVEMENT_PENALTIES = {"ice": 2, "snow": 2, "wet": 0.5}
+
+# NWS alert severities that add to the score; minor/unknown add nothing.
+_ALERT_PENALTIES = {"extreme": 2, "severe": 2, "moderate": 1}
 
 
 def classify_rain_intensity(mm_hr):
-    if mm_hr is None or mm_hr < 0.1:
+    if mm_hr is None:
         return "none"
-    elif mm_hr < 0.5:
-        return "light"
-    elif mm_hr < 4.0:
-        return "moderate"
-    else:
-        return "heavy"
+    return _RAIN_LABELS[bisect_right(_RAIN_KEYS, mm_hr)]
 
 
 def classify_fog_level(visibility_miles):
-    if visibility_miles is None or visibility_miles > 5.0:
+    if visibility_miles is None:
         return "none"
-    elif visibility_miles > 1.0:
-        return "patchy"
-    else:
-        return "dense"
+    return _FOG_LABELS[bisect_left(_FOG_KEYS, visibility_miles)]
+
+
+# Twilight window either side of sunrise/sunset, in seconds
+_TWILIGHT_MARGIN = 30 * 60.0
+
+
+@lru_cache(maxsize=1024)
+def _parse_sun_time(value, tzinfo):
+    """Parse an Open-Meteo sunrise/sunset string, localising it to tzinfo if naive.
+
+    Every segment on a day shares the same few strings and ETA timezone.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None and tzinfo is not None:
+        parsed = parsed.replace(tzinfo=tzinfo)
+    return parsed
 
 
 def classify_light_level(eta, sunrise_str, sunset_str):
@@ -36,33 +76,15 @@ def classify_light_level(eta, sunrise_str, sunset_str):
     if sunrise_str is None or sunset_str is None:
         return "day"
 
-    sunrise = datetime.fromisoformat(sunrise_str)
-    sunset = datetime.fromisoformat(sunset_str)
-
-    # Handle timezone-naive sunrise/sunset vs timezone-aware ETA
-    if sunrise.tzinfo is None and eta.tzinfo is not None:
-        sunrise = sunrise.replace(tzinfo=eta.tzinfo)
-    if sunset.tzinfo is None and eta.tzinfo is not None:
-        sunset = sunset.replace(tzinfo=eta.tzinfo)
-
-    margin = timedelta(minutes=30)
-
-    diff_from_sunrise = (eta - sunrise).total_seconds()
-    diff_from_sunset = (sunset - eta).total_seconds()
+    # Timezone-naive sunrise/sunset are taken to be in the ETA's timezone
+    since_sunrise = (eta - _parse_sun_time(sunrise_str, eta.tzinfo)).total_seconds()
+    until_sunset = (_parse_sun_time(sunset_str, eta.tzinfo) - eta).total_seconds()
 
-    # Within 30 min of sunrise (before or after)
-    if abs(diff_from_sunrise) <= margin.total_seconds():
+    margin = _TWILIGHT_MARGIN
+    if -margin <= since_sunrise <= margin or -margin <= until_sunset <= margin:
         return "twilight"
-
-    # Within 30 min of sunset (before or after)
-    if abs(diff_from_sunset) <= margin.total_seconds():
-        return "twilight"
-
-    # After sunrise+30min and before sunset-30min => day
-    if diff_from_sunrise > margin.total_seconds() and diff_from_sunset > margin.total_seconds():
+    if since_sunrise > margin and until_sunset > margin:
         return "day"
-
-    # Everything else is night
     return "night"
 
 
@@ -110,62 +132,90 @@ def compute_weather_slowdown(weather, light_level="day"):
     return round(factor, 3)
 
 
+# Stand-in for a missing source in merge_weather; only ever read, never mutated.
+_NO_SOURCE = {}
+
+
 def merge_weather(nws=None, openmeteo=None, tomorrow=None):
     """Merge weather data from up to 3 sources using design merge rules."""
     result = {}
 
+    # With at most three sources, each reducer below works on scalars
+    # directly rather than building a throwaway list per field.
+
     # Temperature: average of Open-Meteo and Tomorrow.io
-    temps = []
-    if openmeteo and openmeteo.get("temperature_f") is not None:
-        temps.append(openmeteo["temperature_f"])
-    if tomorrow and tomorrow.get("temperature_f") is not None:
-        temps.append(tomorrow["temperature_f"])
-    if nws and nws.get("temperature_f") is not None and not temps:
-        temps.append(nws["temperature_f"])
-    result["temperature_f"] = round(sum(temps) / len(temps), 1) if temps else None
+    om_temp = openmeteo.get("temperature_f") if openmeteo else None
+    tm_temp = tomorrow.get("temperature_f") if tomorrow else None
+    if om_temp is not None and tm_temp is not None:
+        result["temperature_f"] = round((om_temp + tm_temp) / 2, 1)
+    elif om_temp is not None or tm_temp is not None:
+        result["temperature_f"] = round(float(om_temp if om_temp is not None else tm_temp), 1)
+    elif nws and nws.get("temperature_f") is not None:
+        result["temperature_f"] = round(float(nws["temperature_f"]), 1)
+    else:
+        result["temperature_f"] = None
 
     # Wind speed/gusts: max of all (conservative)
-    winds = [s.get("wind_speed_mph", 0) for s in [nws, openmeteo, tomorrow] if s]
-    result["wind_speed_mph"] = max(winds) if winds else 0
-    gusts = [s.get("wind_gusts_mph", 0) for s in [openmeteo, tomorrow] if s and s.get("wind_gusts_mph")]
-    result["wind_gusts_mph"] = max(gusts) if gusts else result["wind_speed_mph"]
+    # Sources report missing fields as None, so treat those as 0 too
+    result["wind_speed_mph"] = max(
+        (nws.get("wind_speed_mph") or 0) if nws else 0,
+        (openmeteo.get("wind_speed_mph") or 0) if openmeteo else 0,
+        (tomorrow.get("wind_speed_mph") or 0) if tomorrow else 0,
+    )
+    gust = max(
+        (openmeteo.get("wind_gusts_mph") or 0) if openmeteo else 0,
+        (tomorrow.get("wind_gusts_mph") or 0) if tomorrow else 0,
+    )
+    result["wind_gusts_mph"] = gust or result["wind_speed_mph"]
 
     # Wind direction: from Open-Meteo
-    result["wind_direction_deg"] = (openmeteo or {}).get("wind_direction_deg")
+    result["wind_direction_deg"] = (openmeteo or _NO_SOURCE).get("wind_direction_deg")
 
     # Precip probability: max (conservative)
-    probs = [s.get("precipitation_probability", 0) for s in [nws, tomorrow] if s]
-    result["precipitation_probability"] = max(probs) if probs else 0
+    result["precipitation_probability"] = max(
+        (nws.get("precipitation_probability") or 0) if nws else 0,
+        (tomorrow.get("precipitation_probability") or 0) if tomorrow else 0,
+    )
 
     # Precip type: Tomorrow.io preferred
-    result["precipitation_type"] = (tomorrow or {}).get("precipitation_type", "none")
+    result["precipitation_type"] = (tomorrow or _NO_SOURCE).get("precipitation_type", "none")
 
     # Precip mm/hr: Open-Meteo
-    result["precipitation_mm_hr"] = (openmeteo or {}).get("precipitation_mm_hr", 0)
+    result["precipitation_mm_hr"] = (openmeteo or _NO_SOURCE).get("precipitation_mm_hr", 0)
     result["rain_intensity"] = classify_rain_intensity(result["precipitation_mm_hr"])
 
     # Visibility: min (conservative)
-    vis = [s.get("visibility_miles") for s in [openmeteo, tomorrow] if s and s.get("visibility_miles") is not None]
-    result["visibility_miles"] = min(vis) if vis else None
+    om_vis = openmeteo.get("visibility_miles") if openmeteo else None
+    tm_vis = tomorrow.get("visibility_miles") if tomorrow else None
+    if om_vis is None:
+        result["visibility_miles"] = tm_vis
+    elif tm_vis is None:
+        result["visibility_miles"] = om_vis
+    else:
+        result["visibility_miles"] = min(om_vis, tm_vis)
     result["fog_level"] = classify_fog_level(result["visibility_miles"])
 
     # Snow: Open-Meteo
-    result["snow_depth_in"] = (openmeteo or {}).get("snow_depth_in", 0)
-    result["freezing_level_ft"] = (openmeteo or {}).get("freezing_level_ft")
+    result["snow_depth_in"] = (openmeteo or _NO_SOURCE).get("snow_depth_in", 0)
+    result["freezing_level_ft"] = (openmeteo or _NO_SOURCE).get("freezing_level_ft")
 
     # Condition text: NWS
-    result["condition_text"] = (nws or {}).get("condition_text", (tomorrow or {}).get("weather_text", ""))
+    result["condition_text"] = (nws or _NO_SOURCE).get("condition_text", (tomorrow or _NO_SOURCE).get("weather_text", ""))
 
     # Road risk: Tomorrow.io
-    result["road_risk_score"] = (tomorrow or {}).get("road_risk_score")
-    result["road_risk_label"] = (tomorrow or {}).get("road_risk_label")
+    result["road_risk_score"] = (tomorrow or _NO_SOURCE).get("road_risk_score")
+    result["road_risk_label"] = (tomorrow or _NO_SOURCE).get("road_risk_label")
 
     return result
 
 
-def compute_severity(weather, road_conditions=None, alerts=None, light_level="day"):
-    """Compute severity score (0-10) and label (green/yellow/red)."""
-    from config import SEVERITY_VISIBILITY, SEVERITY_WIND, SEVERITY_PRECIP
+def compute_severity(weather, road_conditions=None, alerts=None, light_level="day",
+                     chain_control=None):
+    """Compute severity score (0-10) and label (green/yellow/red).
+
+    chain_control, if given, takes precedence over road_conditions["chain_control"],
+    so callers can score a matched control without copying the road dict.
+    """
     score = 0
     alerts = alerts or []
 
@@ -176,49 +226,34 @@ def compute_severity(weather, road_conditions=None, alerts=None, light_level="da
 
     # Visibility scoring
     if vis is not None:
-        for threshold, penalty in SEVERITY_VISIBILITY:
-            if vis < threshold:
-                score += penalty
-                break
+        score += _VIS_PENALTIES[bisect_right(_VIS_KEYS, vis)]
 
     # Wind scoring
     effective_wind = max(wind, gusts * 0.7) if gusts else wind
-    for threshold, penalty in SEVERITY_WIND:
-        if effective_wind > threshold:
-            score += penalty
-            break
+    score += _WIND_PENALTIES[bisect_left(_WIND_KEYS, effective_wind)]
 
     # Precipitation scoring
-    for threshold, penalty in SEVERITY_PRECIP:
-        if precip > threshold:
-            score += penalty
-            break
+    score += _PRECIP_PENALTIES[bisect_left(_PRECIP_KEYS, precip)]
 
     # Road conditions
-    if road_conditions:
-        chain = road_conditions.get("chain_control")
-        if chain:
-            level = chain.get("level", "")
-            if level == "R3":
-                score += 3
-            elif level == "R2":
-                score += 2
-            elif level == "R1":
-                score += 1
+    chain = chain_control or (road_conditions.get("chain_control") if road_conditions else None)
+    if chain:
+        level = chain.get("level", "")
+        if level == "R3":
+            score += 3
+        elif level == "R2":
+            score += 2
+        elif level == "R1":
+            score += 1
 
+    if road_conditions:
         pavement = road_conditions.get("pavement_status", "")
-        if pavement and pavement.lower() in ("ice", "snow"):
-            score += 2
-        elif pavement and pavement.lower() == "wet":
-            score += 0.5
+        if pavement:
+            score += _PAVEMENT_PENALTIES.get(pavement.lower(), 0)
 
     # Alerts
     for alert in alerts:
-        sev = alert.get("severity", "")
-        if sev in ("extreme", "severe"):
-            score += 2
-        elif sev == "moderate":
-            score += 1
+        score += _ALERT_PENALTIES.get(alert.get("severity"), 0)
 
     # Light level adjustments
     has_weather_hazard = (
@@ -244,15 +279,27 @@ def compute_severity(weather, road_conditions=None, alerts=None, light_level="da
         return score, "red"
 
 
-def build_source_links(lat, lon, weather, road_conditions):
+_NWS_LINK = "https://forecast.weather.gov/MapClick.php?lat=%s&lon=%s"
+_OPENMETEO_LINK = "https://open-meteo.com/en/docs#latitude=%s&longitude=%s"
+
+
+@lru_cache(maxsize=4096)
+def _point_links(lat, lon):
+    """NWS and Open-Meteo URLs for a point; the same rounded coords recur across slots."""
+    return _NWS_LINK % (lat, lon), _OPENMETEO_LINK % (lat, lon)
+
+
+def build_source_links(lat, lon, weather, road_conditions, chain_control=None):
     """Build dict of external source URLs for a segment."""
+    nws_link, openmeteo_link = _point_links(lat, lon)
     links = {
-        "nws": f"https://forecast.weather.gov/MapClick.php?lat={lat}&lon={lon}",
-        "open_meteo": f"https://open-meteo.com/en/docs#latitude={lat}&longitude={lon}",
+        "nws": nws_link,
+        "open_meteo": openmeteo_link,
     }
     if weather.get("road_risk_score") is not None:
         links["tomorrow_io"] = "https://www.tomorrow.io/weather/"
-    if road_conditions and (road_conditions.get("chain_control") or road_conditions.get("pavement_status")):
+    if chain_control or (road_conditions and (road_conditions.get("chain_control")
+                                              or road_conditions.get("pavement_status"))):
         links["caltrans"] = "https://roads.dot.ca.gov/"
     return links
 
@@ -264,61 +311,90 @@ def _wp_coords(wp):
     return wp[0], wp[1]
 
 
+def _wp_meta(wp):
+    """Extract (data_source, station_name) from a waypoint dict or tuple."""
+    if not isinstance(wp, dict):
+        return "fill", None
+    station_name = None
+    station = wp.get("station")
+    if station and isinstance(station, dict):
+        station_name = station.get("location", {}).get("locationName")
+    return wp.get("type", "fill"), station_name
+
+
+@lru_cache(maxsize=256)
+def _nearest_steps(coords, step_coords):
+    """Index of the route step starting closest to each waypoint (None if none found).
+
+    Memoised per route: every slider slot matches the same waypoints against
+    the same steps, so the full waypoint x step scan only runs once.
+
+    Compares the haversine term rather than full distances: distance is
+    monotonic in it, so the closest step is the same without the
+    asin/sqrt, and each step's cos(lat) is computed once up front.
+    """
+    steps = [(slat, slng, math.cos(math.radians(slat))) for slat, slng in step_coords]
+    nearest = []
+    for wp_lat, wp_lon in coords:
+        cos_wp = math.cos(math.radians(wp_lat))
+        best = None
+        best_a = float("inf")
+        for j, (slat, slng, cos_step) in enumerate(steps):
+            a = (math.sin(math.radians(slat - wp_lat) / 2) ** 2 +
+                 cos_wp * cos_step * math.sin(math.radians(slng - wp_lon) / 2) ** 2)
+            if a < best_a:
+                best_a = a
+                best = j
+        nearest.append(best)
+    return tuple(nearest)
+
+
 def build_segments(waypoints, etas, route_steps, weather_data, road_data, alerts_by_segment,
                    chain_controls=None, light_levels=None, sun_times=None):
     """Assemble the final segments list for the API response."""
     segments = []
     cumulative_miles = 0.0
-
-    for i, (wp, eta) in enumerate(zip(waypoints, etas)):
-        wp_lat, wp_lon = _wp_coords(wp)
+    # Leg distances are memoised per route, so slots don't redo the haversines
+    leg_miles = segment_distances(waypoints)
+    coords = tuple(_wp_coords(wp) for wp in waypoints)
+    metas = [_wp_meta(wp) for wp in waypoints]
+
+    # Step start coordinates are the same for every waypoint, so pull them
+    # out of the step dicts once rather than in the nearest-step search
+    route_steps = route_steps or []
+    step_coords = []
+    for step in route_steps:
+        sloc = step.get("start_location", {})
+        step_coords.append((
+            sloc.get("latitude") or sloc.get("lat", 0),
+            sloc.get("longitude") or sloc.get("lng", 0),
+        ))
+    nearest_steps = _nearest_steps(coords, tuple(step_coords)) if route_steps else ()
+    cc_index = build_cc_index(chain_controls) if chain_controls else None
+
+    for i, ((wp_lat, wp_lon), (data_source, station_name), eta) in enumerate(zip(coords, metas, etas)):
         if i > 0:
-            prev_lat, prev_lon = _wp_coords(waypoints[i-1])
-            cumulative_miles += haversine_miles(prev_lat, prev_lon, wp_lat, wp_lon)
+            cumulative_miles += leg_miles[i - 1]
 
         weather = weather_data[i] if i < len(weather_data) else {}
         road = road_data[i] if i < len(road_data) else None
         seg_alerts = alerts_by_segment[i] if i < len(alerts_by_segment) else []
 
-        # Extract data_source and station_name from dict waypoints
-        if isinstance(wp, dict):
-            data_source = wp.get("type", "fill")
-            station_name = None
-            station = wp.get("station")
-            if station and isinstance(station, dict):
-                station_name = station.get("location", {}).get("locationName")
-        else:
-            data_source = "fill"
-            station_name = None
-
         # Find matching turn instruction
         instruction = ""
-        if route_steps:
-            best_step = None
-            best_dist = float("inf")
-            for step in route_steps:
-                sloc = step.get("start_location", {})
-                slat = sloc.get("latitude") or sloc.get("lat", 0)
-                slng = sloc.get("longitude") or sloc.get("lng", 0)
-                d = haversine_miles(wp_lat, wp_lon, slat, slng)
-                if d < best_dist:
-                    best_dist = d
-                    best_step = step
+        if nearest_steps and nearest_steps[i] is not None:
+            best_step = route_steps[nearest_steps[i]]
             if best_step:
                 instruction = best_step.get("instruction", "")
 
         # Match chain controls to this segment's instruction
-        cc_match = match_chain_control_to_instruction(chain_controls, instruction)
-
-        # Build road_conditions for severity: merge RWIS data + chain control
-        road_for_severity = dict(road) if road else {}
-        if cc_match:
-            road_for_severity["chain_control"] = cc_match
+        cc_match = match_chain_control_to_instruction(chain_controls, instruction, index=cc_index)
 
         light = light_levels[i] if light_levels and i < len(light_levels) else "day"
 
+        # Score RWIS data + matched chain control without merging them into a copy
         severity_score, severity_label = compute_severity(
-            weather, road_for_severity or None, seg_alerts, light_level=light
+            weather, road, seg_alerts, light_level=light, chain_control=cc_match
         )
 
         rounded_lat = round(wp_lat, 5)
@@ -343,7 +419,7 @@ def build_segments(waypoints, etas, route_steps, weather_data, road_data, alerts
             "severity_label": severity_label,
             "data_source": data_source,
             "source_links": build_source_links(
-                rounded_lat, rounded_lon, weather, road_for_severity
+                rounded_lat, rounded_lon, weather, road, chain_control=cc_match
             ),
         }
 
@@ -21,6 +21,33 @@ CALTRANS_RWIS_DISTRICTS = [2, 3, 6, 8, 9, 10]
 CALTRANS_CC_URL = "https://cwwp2.dot.ca.gov/data/d{district}/cc/ccStatusD{district}.json"
 CALTRANS_RWIS_URL = "https://cwwp2.dot.ca.gov/data/d{district}/rwis/rwisStatusD{district}.json"
 
+# Concrete per-district URLs, formatted once at import
+CALTRANS_CC_URLS = {d: CALTRANS_CC_URL.format(district=d) for d in CALTRANS_DISTRICTS}
+CALTRANS_RWIS_URLS = {d: CALTRANS_RWIS_URL.format(district=d) for d in CALTRANS_RWIS_DISTRICTS}
+
+# Per-upstream deadlines so one slow weather source doesn't stall the rest
+UPSTREAM_TIMEOUT_SECONDS = 5.0
+OPENMETEO_TIMEOUT_SECONDS = 8.0   # one batched request for every waypoint
+TOMORROW_TIMEOUT_SECONDS = 4.0
+# Max in-flight NWS requests per route, below the connector's per-host limit
+NWS_MAX_CONCURRENCY = 8
+# Max in-flight Tomorrow.io requests per route
+TOMORROW_MAX_CONCURRENCY = 3
+# Max in-flight Google Places lookups per route, to stay inside quota bursts
+PLACES_MAX_CONCURRENCY = 5
+
+# Coarse slider schedule: (within_hours_of_departure, step_minutes), innermost first
+SLIDER_COARSE_STEPS = [
+    (2, 15),
+    (12, 60),
+    (48, 180),
+]
+
+# Response compression: brotli (if installed) or gzip for JSON bodies at least this large
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 4
+BROTLI_QUALITY = 4
+
 # Severity scoring thresholds
 
 # Visibility: (miles_less_than, score_penalty)
@@ -0,0 +1,70 @@
+# http_client.py
+"""Shared aiohttp session for all outbound API calls."""
+
+import asyncio
+import atexit
+import json
+import aiohttp
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Pass as resp.json(loads=json_loads): orjson parses upstream bodies
+# several times faster than the stdlib json module.
+json_loads = orjson.loads if orjson is not None else json.loads
+
+_session = None
+_session_loop = None
+
+
+def _new_session():
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=30,
+        ttl_dns_cache=300,
+        keepalive_timeout=75,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        # sock_connect/sock_read rather than connect: connect also counts time
+        # spent queued for a pooled connection under limit_per_host.
+        timeout=aiohttp.ClientTimeout(total=15, sock_connect=2, sock_read=5),
+    )
+
+
+async def get_shared_session():
+    """Return the process-wide ClientSession, creating it on first use.
+
+    A session is bound to the event loop it was created on, so a new one is
+    created if the caller is running on a different loop.
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = _new_session()
+        _session_loop = loop
+    return _session
+
+
+async def close_shared_session():
+    """Close the shared session (if any)."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+def _close_at_exit():
+    if _session is None or _session.closed or _session_loop.is_closed():
+        return
+    if _session_loop.is_running():
+        future = asyncio.run_coroutine_threadsafe(close_shared_session(), _session_loop)
+        future.result(timeout=5)
+    else:
+        _session_loop.run_until_complete(close_shared_session())
+
+
+atexit.register(_close_at_exit)
@@ -1,71 +1,177 @@
 # planner.py
 import asyncio
+import threading
 from datetime import datetime, timezone, timedelta
-
-from routing import compute_etas, compute_adjusted_etas
-from weather_nws import fetch_nws_forecast, fetch_nws_alerts, find_forecast_for_time
-from weather_openmeteo import fetch_openmeteo, find_data_for_time as find_openmeteo_for_time
-from weather_tomorrow import fetch_tomorrow, find_data_for_time as find_tomorrow_for_time
-from road_conditions import fetch_chain_controls, fetch_rwis_stations, match_rwis_to_waypoint
+from functools import lru_cache
+
+from routing import compute_etas, compute_adjusted_etas, _coords
+from weather_nws import fetch_nws_forecast, fetch_nws_alerts, index_forecast, find_forecast_in_index
+from weather_openmeteo import (fetch_openmeteo, index_hourly_times, find_data_in_index as find_openmeteo_in_index,
+                               index_sun_times, find_sun_times_in_index)
+from weather_tomorrow import fetch_tomorrow, index_intervals, find_data_in_index as find_tomorrow_in_index
+from road_conditions import fetch_chain_controls, fetch_rwis_stations, match_rwis_to_waypoint, build_rwis_index
 from assembler import merge_weather, build_segments, compute_weather_slowdown, classify_light_level
+from rest_stops import apply_rest_stop_delays, insert_rest_stop_segments
+from utils import async_ttl_cache
+from config import (UPSTREAM_TIMEOUT_SECONDS, OPENMETEO_TIMEOUT_SECONDS, TOMORROW_TIMEOUT_SECONDS,
+                    NWS_MAX_CONCURRENCY, TOMORROW_MAX_CONCURRENCY, SLIDER_COARSE_STEPS)
 
 
-def _wp_lat(wp):
-    """Extract latitude from a waypoint (tuple or dict)."""
-    return wp["lat"] if isinstance(wp, dict) else wp[0]
+@lru_cache(maxsize=1024)
+def _parse_expires(expires_str):
+    """Parse an alert expiry string, assuming UTC when naive."""
+    expires = datetime.fromisoformat(expires_str)
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires
 
 
-def _wp_lon(wp):
-    """Extract longitude from a waypoint (tuple or dict)."""
-    return wp["lon"] if isinstance(wp, dict) else wp[1]
+def _alert_expires(alert):
+    """Return an alert's expiry as an aware datetime, or None if it has none."""
+    expires_str = alert.get("expires")
+    if not expires_str:
+        return None
+    return _parse_expires(expires_str)
 
 
 def alert_active_at(alert, eta):
     """Return True if alert is still active at the given ETA."""
-    expires_str = alert.get("expires")
-    if not expires_str:
-        return True
-    expires = datetime.fromisoformat(expires_str)
-    if expires.tzinfo is None:
-        expires = expires.replace(tzinfo=timezone.utc)
-    return expires > eta
+    expires = _alert_expires(alert)
+    return expires is None or expires > eta
+
+
+def _coarse_offsets(steps):
+    """Minute offsets from departure for the coarse slider schedule."""
+    offsets = set()
+    inner_minutes = 0
+    for within_hours, step_minutes in steps:
+        for m in range(0, within_hours * 60 + 1, step_minutes):
+            if m >= inner_minutes:
+                offsets.update((m, -m))
+        inner_minutes = within_hours * 60
+    return tuple(sorted(offsets))
+
+
+_COARSE_OFFSETS = _coarse_offsets(SLIDER_COARSE_STEPS)
+_COARSE_DELTAS = tuple(timedelta(minutes=m) for m in _COARSE_OFFSETS)
+
+_HOUR = timedelta(hours=1)
+_SLIDER_SPAN = timedelta(hours=48)
+
 
+def compute_slider_range(departure, now, resolution="fine"):
+    """Compute departure slots from max(now, departure-48h) to departure+48h.
 
-def compute_slider_range(departure, now):
-    """Compute hourly departure slots from max(now, departure-48h) to departure+48h."""
-    range_start = max(now, departure - timedelta(hours=48))
+    "fine" gives hourly slots. "coarse" follows SLIDER_COARSE_STEPS:
+    15-minute steps near the departure, thinning out towards the edges.
+    """
+    if resolution == "coarse":
+        slots = (departure + delta for delta in _COARSE_DELTAS)
+        return [slot for slot in slots if slot >= now]
+
+    range_start = max(now, departure - _SLIDER_SPAN)
     if range_start.minute > 0 or range_start.second > 0:
-        range_start = range_start.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        range_start = range_start.replace(minute=0, second=0, microsecond=0) + _HOUR
     else:
         range_start = range_start.replace(minute=0, second=0, microsecond=0)
 
-    range_end = departure + timedelta(hours=48)
+    range_end = departure + _SLIDER_SPAN
     range_end = range_end.replace(minute=0, second=0, microsecond=0)
 
-    slots = []
-    current = range_start
-    while current <= range_end:
-        slots.append(current)
-        current += timedelta(hours=1)
-    return slots
+    count = max((range_end - range_start) // _HOUR + 1, 0)
+    return list(_hourly_slots(range_start, range_start.tzinfo, count))
+
+
+def is_slider_slot(departure, slot, resolution="fine"):
+    """True if slot is on departure's slider schedule.
+
+    Checks the full schedule rather than the part still ahead of now, so
+    a page left open keeps its slots valid after the departure passes.
+    """
+    return slot in compute_slider_range(departure, departure - _SLIDER_SPAN, resolution)
+
+
+@lru_cache(maxsize=256)
+def _hourly_slots(range_start, tzinfo, count):
+    # tzinfo is part of the key because equal instants in different zones
+    # hash alike but format differently.
+    return tuple(range_start + _HOUR * h for h in range(count))
+
+
+async def _with_timeout(coro, fallback, timeout=UPSTREAM_TIMEOUT_SECONDS, semaphore=None, failures=None):
+    """Await one upstream call, returning fallback if it fails or stalls.
+
+    Each call gets its own deadline so a slow source only drops its own
+    data instead of holding up the rest. Cancellation still propagates.
+    With a semaphore, the deadline only starts once a slot is acquired,
+    so queued calls don't time out before they are sent. If a failures
+    list is given, the error is appended to it, so callers can tell a
+    fallback apart from a genuinely empty result.
+    """
+    try:
+        if semaphore is None:
+            return await asyncio.wait_for(coro, timeout=timeout)
+        async with semaphore:
+            return await asyncio.wait_for(coro, timeout=timeout)
+    except Exception as exc:
+        if failures is not None:
+            failures.append(exc)
+        return fallback
+
+
+def _raw_weather_cache_key(waypoints, session=None, rwis_stations=None):
+    """Cache raw weather per route, keyed on the waypoints' ~1 km grid cells."""
+    return tuple((round(lat, 2), round(lon, 2)) for lat, lon in map(_coords, waypoints))
+
+
+def _is_complete(raw):
+    """Only cache bundles where no source fell back after failing or timing out."""
+    return not raw["partial"]
 
 
+@async_ttl_cache(ttl_seconds=300, key=_raw_weather_cache_key, maxsize=512, cache_if=_is_complete)
 async def fetch_raw_weather(waypoints, session, rwis_stations=None):
     """Fetch raw weather data from all sources (no ETA lookup).
 
+    Bundles where a source fell back are marked "partial" and not cached,
+    so one slow upstream call doesn't drop that source for every trip over
+    the same cells until the TTL runs out.
+
+    Only the I/O happens here. The bundle is indexed (index_raw_weather) on
+    first use by the request thread, keeping that parsing off the shared
+    event loop.
+
     Args:
         waypoints: list of (lat, lon) tuples or dicts with "lat"/"lon" keys.
         session: aiohttp.ClientSession
         rwis_stations: optional pre-fetched RWIS station list.
     """
-    lats = [_wp_lat(wp) for wp in waypoints]
-    lons = [_wp_lon(wp) for wp in waypoints]
+    coords = [_coords(wp) for wp in waypoints]
+    lats = [lat for lat, _ in coords]
+    lons = [lon for _, lon in coords]
+    failures = []
     
     # Open-Meteo handles multiple coordinates in one batch request
-    openmeteo_task = fetch_openmeteo(lats, lons, session=session)
-
-    nws_tasks = [fetch_nws_forecast(*wp_tuple, session=session) for wp_tuple in zip(lats, lons)]
-    nws_alert_tasks = [fetch_nws_alerts(*wp_tuple, session=session) for wp_tuple in zip(lats, lons)]
+    openmeteo_task = _with_timeout(fetch_openmeteo(lats, lons, session=session), [None] * len(waypoints),
+                                   timeout=OPENMETEO_TIMEOUT_SECONDS, failures=failures)
+
+    # Nearby waypoints share an NWS grid cell (and forecast), so fetch each
+    # ~1 km cell once from its first waypoint and fan the result back out.
+    cells = [(round(lat, 2), round(lon, 2)) for lat, lon in coords]
+    cell_points = {}
+    for cell, wp_tuple in zip(cells, coords):
+        cell_points.setdefault(cell, wp_tuple)
+
+    # Forecasts and alerts both hit api.weather.gov; bound them together.
+    # The fetchers carry no limit of their own, so every call that holds a
+    # slot is actually in flight while its deadline runs.
+    nws_sem = asyncio.Semaphore(NWS_MAX_CONCURRENCY)
+    nws_tasks = [_with_timeout(fetch_nws_forecast(*wp_tuple, session=session), None,
+                               timeout=UPSTREAM_TIMEOUT_SECONDS, semaphore=nws_sem, failures=failures)
+                 for wp_tuple in cell_points.values()]
+    nws_alert_tasks = [_with_timeout(fetch_nws_alerts(*wp_tuple, session=session), [],
+                                     timeout=UPSTREAM_TIMEOUT_SECONDS, semaphore=nws_sem, failures=failures)
+                       for wp_tuple in cell_points.values()]
 
     # Tomorrow.io Spatial Sampling: limit to max 5 calls per route
     tomorrow_indices = []
@@ -75,59 +181,66 @@ async def fetch_raw_weather(waypoints, session, rwis_stations=None):
         step = (len(waypoints) - 1) / 4.0
         tomorrow_indices = [int(round(i * step)) for i in range(5)]
     
-    tomorrow_tasks_sampled = [
-        fetch_tomorrow(lats[idx], lons[idx], session=session)
-        for idx in tomorrow_indices
+    # Sample points on short routes can share a grid cell; fetch each cell once
+    tomorrow_cells = list(dict.fromkeys(cells[idx] for idx in tomorrow_indices))
+    tomorrow_sem = asyncio.Semaphore(TOMORROW_MAX_CONCURRENCY)
+    tomorrow_tasks = [
+        _with_timeout(fetch_tomorrow(*cell_points[cell], session=session), [],
+                      timeout=TOMORROW_TIMEOUT_SECONDS, semaphore=tomorrow_sem, failures=failures)
+        for cell in tomorrow_cells
     ]
 
+    # Not wrapped in _with_timeout: each district has its own deadline and
+    # falls back to [], so one slow district can't discard the others.
     cc_task = fetch_chain_controls(session=session)
 
     if rwis_stations is None:
-        rwis_task = fetch_rwis_stations(session=session)
+        rwis_task = _with_timeout(fetch_rwis_stations(session=session), [], failures=failures)
     else:
         async def _return_stations(): return rwis_stations
         rwis_task = _return_stations()
 
-    results = await asyncio.gather(
+    # Every task falls back to an empty result on error or timeout, so
+    # nothing here raises and no exception filtering is needed.
+    (openmeteo_results, nws_cell_results, nws_cell_alerts, tomorrow_cell_results,
+     chain_controls, rwis_result) = await asyncio.gather(
         openmeteo_task,
-        asyncio.gather(*nws_tasks, return_exceptions=True),
-        asyncio.gather(*nws_alert_tasks, return_exceptions=True),
-        asyncio.gather(*tomorrow_tasks_sampled, return_exceptions=True),
+        asyncio.gather(*nws_tasks),
+        asyncio.gather(*nws_alert_tasks),
+        asyncio.gather(*tomorrow_tasks),
         cc_task,
         rwis_task,
-        return_exceptions=True,
     )
 
-    openmeteo_results = results[0] if not isinstance(results[0], Exception) else [None] * len(waypoints)
-    nws_results = results[1] if not isinstance(results[1], Exception) else [None] * len(waypoints)
-    nws_alerts = results[2] if not isinstance(results[2], Exception) else [[] for _ in waypoints]
-    sampled_tomorrow = results[3] if not isinstance(results[3], Exception) else [[] for _ in tomorrow_indices]
-    chain_controls = results[4] if not isinstance(results[4], Exception) else []
-    rwis_result = results[5] if not isinstance(results[5], Exception) else []
+    nws_by_cell = dict(zip(cell_points, nws_cell_results))
+    alerts_by_cell = dict(zip(cell_points, nws_cell_alerts))
+    nws_results = [nws_by_cell[cell] for cell in cells]
+    nws_alerts = [alerts_by_cell[cell] for cell in cells]
+    tomorrow_by_cell = dict(zip(tomorrow_cells, tomorrow_cell_results))
+    sampled_tomorrow = [tomorrow_by_cell[cells[idx]] for idx in tomorrow_indices]
 
-    # Distribute sampled tomorrow.io results to all waypoints
+    # Distribute sampled tomorrow.io results to all waypoints: each takes the
+    # nearest sample (the earlier one on ties). The sample indices are
+    # ascending, so one sweep finds them all.
     tomorrow_results = []
+    j = 0
     for i in range(len(waypoints)):
-        best_idx = min(tomorrow_indices, key=lambda idx: abs(idx - i))
-        res_idx = tomorrow_indices.index(best_idx)
-        res = sampled_tomorrow[res_idx]
-        tomorrow_results.append(res if not isinstance(res, Exception) else [])
-
-    # Clean NWS exceptions
-    nws_results = [r if not isinstance(r, Exception) else None for r in nws_results]
-    nws_alerts = [r if not isinstance(r, Exception) else [] for r in nws_alerts]
+        while (j + 1 < len(tomorrow_indices)
+               and abs(tomorrow_indices[j + 1] - i) < abs(tomorrow_indices[j] - i)):
+            j += 1
+        tomorrow_results.append(sampled_tomorrow[j])
 
-    # Track which sources actually returned data
+    # Track which sources actually returned data, checking each once on the
+    # per-cell/per-sample results rather than the per-waypoint fan-out
     sources_set = set()
-    if openmeteo_results and any(r is not None for r in openmeteo_results):
+    # Open-Meteo is one batch request: it either fills every slot or none
+    if openmeteo_results and openmeteo_results[0] is not None:
         sources_set.add("Open-Meteo")
-    if nws_results and any(r is not None for r in nws_results):
+    if any(periods is not None for periods in nws_cell_results):
         sources_set.add("NWS")
-    if sampled_tomorrow and any(r and not isinstance(r, Exception) for r in sampled_tomorrow):
+    if any(tomorrow_cell_results):
         sources_set.add("Tomorrow.io")
-    if chain_controls:
-        sources_set.add("Caltrans CWWP2")
-    if rwis_result:
+    if chain_controls or rwis_result:
         sources_set.add("Caltrans CWWP2")
 
     return {
@@ -138,67 +251,173 @@ async def fetch_raw_weather(waypoints, session, rwis_stations=None):
         "chain_controls": chain_controls,
         "rwis_stations": rwis_result,
         "sources": sorted(sources_set),
+        "partial": bool(failures),
     }
 
 
-def resolve_weather_for_etas(raw, waypoints, etas):
-    """Look up weather at specific ETAs from pre-fetched raw data."""
-    weather_data = []
+def index_raw_weather(raw, waypoints):
+    """Pre-compute everything in raw data that does not depend on ETA.
+
+    Slider slots resolve the same raw forecasts at many ETAs, so each
+    waypoint's time axes are parsed once here and each lookup becomes a
+    bisect. RWIS matches depend only on geometry and alert expiries only
+    on the alert, so both are computed once as well.
+
+    The new keys are added to raw in one update at the end, so another
+    thread sharing the cached bundle never sees a partial index.
+    """
+    rwis_index = build_rwis_index(raw["rwis_stations"])
+    index = {
+        "rwis_index": rwis_index,
+        "rwis_matches": match_rwis_for_waypoints(raw, waypoints, rwis_index),
+        "nws_alert_expires": [
+            [_alert_expires(a) for a in seg_alerts] for seg_alerts in raw["nws_alerts"]
+        ],
+        "merged_weather": {},
+        "slowdowns": {},
+    }
+    # Waypoints in the same NWS grid cell share one periods list; index each once
+    by_periods = {}
+    nws_index = []
+    for periods in raw["nws"]:
+        if not periods:
+            nws_index.append(None)
+            continue
+        if id(periods) not in by_periods:
+            by_periods[id(periods)] = index_forecast(periods)
+        nws_index.append(by_periods[id(periods)])
+    index["nws_index"] = nws_index
+    index["openmeteo_index"] = [
+        index_hourly_times(d) if d and "hourly" in d else None
+        for d in (raw["openmeteo"] or [])
+    ]
+    index["sun_index"] = [index_sun_times(d) if d else None for d in (raw["openmeteo"] or [])]
+    # Tomorrow.io samples are shared between waypoints; index each once
+    by_sample = {}
+    tomorrow_index = []
+    for intervals in raw["tomorrow"]:
+        if not intervals:
+            tomorrow_index.append(None)
+            continue
+        if id(intervals) not in by_sample:
+            by_sample[id(intervals)] = index_intervals(intervals)
+        tomorrow_index.append(by_sample[id(intervals)])
+    index["tomorrow_index"] = tomorrow_index
+    raw.update(index)
+    return raw
+
+
+_index_lock = threading.Lock()
+
+
+def _ensure_indexed(raw, waypoints):
+    """Index a raw bundle on first use; cached bundles are shared between threads."""
+    if "nws_index" in raw:
+        return
+    with _index_lock:
+        if "nws_index" not in raw:
+            index_raw_weather(raw, waypoints)
+
+
+def match_rwis_for_waypoints(raw, waypoints, rwis_index):
+    """Match each waypoint to its nearest RWIS station (or its tagged station)."""
     road_data = []
-    alerts_by_segment = []
+    for wp in waypoints:
+        if isinstance(wp, dict) and wp.get("type") == "rwis" and wp.get("station"):
+            rwis_match = match_rwis_to_waypoint([wp["station"]], _coords(wp), radius_miles=9999)
+        else:
+            rwis_match = match_rwis_to_waypoint(raw["rwis_stations"], _coords(wp),
+                                                index=rwis_index)
+        road_data.append(rwis_match)
+    return road_data
+
 
-    for i, (wp, eta) in enumerate(zip(waypoints, etas)):
+def resolve_weather_only(raw, waypoints, etas):
+    """Look up merged weather at specific ETAs, without alerts or road data.
+
+    This is all that slowdown estimation needs, so the first pass in
+    build_slot_data uses it instead of resolve_weather_for_etas.
+    """
+    _ensure_indexed(raw, waypoints)
+    nws_index = raw["nws_index"]
+    openmeteo_index = raw["openmeteo_index"]
+    tomorrow_index = raw["tomorrow_index"]
+    merged_cache = raw["merged_weather"]
+
+    weather_data = []
+    for i, (_, eta) in enumerate(zip(waypoints, etas)):
         nws_parsed = None
-        if raw["nws"][i]:
-            nws_parsed = find_forecast_for_time(raw["nws"][i], eta)
+        if nws_index[i]:
+            nws_parsed = find_forecast_in_index(nws_index[i], eta)
 
         openmeteo_parsed = None
-        if raw["openmeteo"] and i < len(raw["openmeteo"]) and raw["openmeteo"][i]:
-            openmeteo_parsed = find_openmeteo_for_time(raw["openmeteo"][i], eta)
+        if i < len(openmeteo_index) and openmeteo_index[i]:
+            openmeteo_parsed = find_openmeteo_in_index(openmeteo_index[i], eta)
 
         tomorrow_parsed = None
-        if raw["tomorrow"][i]:
-            tomorrow_parsed = find_tomorrow_for_time(raw["tomorrow"][i], eta)
-
-        merged = merge_weather(nws=nws_parsed, openmeteo=openmeteo_parsed, tomorrow=tomorrow_parsed)
+        if tomorrow_index[i]:
+            tomorrow_parsed = find_tomorrow_in_index(tomorrow_index[i], eta)
+
+        # Parsed entries are memoised per index, so their ids identify the
+        # combination; merge each combination once across all slots.
+        merge_key = (id(nws_parsed), id(openmeteo_parsed), id(tomorrow_parsed))
+        merged = merged_cache.get(merge_key)
+        if merged is None:
+            merged = merge_weather(nws=nws_parsed, openmeteo=openmeteo_parsed, tomorrow=tomorrow_parsed)
+            merged_cache[merge_key] = merged
         weather_data.append(merged)
+    return weather_data
 
-        # RWIS matching
-        if isinstance(wp, dict) and wp.get("type") == "rwis" and wp.get("station"):
-            rwis_match = match_rwis_to_waypoint([wp["station"]], (_wp_lat(wp), _wp_lon(wp)), radius_miles=9999)
-        else:
-            rwis_match = match_rwis_to_waypoint(raw["rwis_stations"], (_wp_lat(wp), _wp_lon(wp)))
-        road_data.append(rwis_match)
 
-        seg_alerts = raw["nws_alerts"][i] if i < len(raw["nws_alerts"]) else []
-        seg_alerts = [a for a in seg_alerts if alert_active_at(a, eta)]
+def resolve_weather_for_etas(raw, waypoints, etas, weather_data=None):
+    """Look up weather at specific ETAs from pre-fetched raw data.
+
+    Pass weather_data if it was already resolved at exactly these ETAs;
+    only alerts and road data are looked up then.
+    """
+    if weather_data is None:
+        weather_data = resolve_weather_only(raw, waypoints, etas)
+    alert_expires = raw["nws_alert_expires"]
+
+    alerts_by_segment = []
+    for i, eta in enumerate(etas[:len(weather_data)]):
+        if i < len(raw["nws_alerts"]):
+            seg_alerts = [a for a, expires in zip(raw["nws_alerts"][i], alert_expires[i])
+                          if expires is None or expires > eta]
+        else:
+            seg_alerts = []
         alerts_by_segment.append(seg_alerts)
 
+    road_data = raw["rwis_matches"][:len(weather_data)]
     return weather_data, road_data, alerts_by_segment, raw["chain_controls"], raw["sources"]
 
 
 def build_slot_data(slot_departure, waypoints, route, raw_weather,
                     base_speed_factor=1.0, rest_stop_info=None, rest_duration_minutes=0):
     """Build segments + alerts for a single departure time using pre-fetched weather."""
-    from weather_openmeteo import find_sun_times_for_date
-    from rest_stops import apply_rest_stop_delays, insert_rest_stop_segments
-
     # 1. Initial ETAs with base speed
     scaled = route["total_duration_seconds"] / base_speed_factor
     initial_etas = compute_etas(waypoints, scaled, slot_departure)
 
-    # 2. First weather resolve
-    weather_data, road_data, alerts_by_segment, chain_controls, sources = \
-        resolve_weather_for_etas(raw_weather, waypoints, initial_etas)
+    # 2. First weather resolve (weather only; alerts and road data come from the final pass)
+    weather_data = resolve_weather_only(raw_weather, waypoints, initial_etas)
 
-    # 3. Compute weather slowdowns
-    openmeteo_results = raw_weather.get("openmeteo", [])
+    # 3. Compute weather slowdowns. Merged weather dicts are shared across
+    # slots, so each (weather, light level) pair is scored once per raw fetch.
+    sun_index = raw_weather["sun_index"]
+    slowdown_cache = raw_weather["slowdowns"]
     slowdowns = []
+    initial_sun_times = []
     for i in range(len(weather_data) - 1):
-        om = openmeteo_results[i] if i < len(openmeteo_results) and openmeteo_results[i] else None
-        sun = find_sun_times_for_date(om, initial_etas[i]) if om else None
+        si = sun_index[i] if i < len(sun_index) else None
+        sun = find_sun_times_in_index(si, initial_etas[i]) if si else None
+        initial_sun_times.append(sun)
         ll = classify_light_level(initial_etas[i], sun["sunrise"] if sun else None, sun["sunset"] if sun else None)
-        slowdowns.append(compute_weather_slowdown(weather_data[i], ll))
+        key = (id(weather_data[i]), ll)
+        slowdown = slowdown_cache.get(key)
+        if slowdown is None:
+            slowdown = slowdown_cache[key] = compute_weather_slowdown(weather_data[i], ll)
+        slowdowns.append(slowdown)
 
     # 4. Adjusted ETAs
     adjusted_etas = compute_adjusted_etas(
@@ -212,16 +431,22 @@ def build_slot_data(slot_departure, waypoints, route, raw_weather,
     else:
         final_etas = adjusted_etas
 
-    # 6. Second weather resolve with final ETAs
+    # 6. Second weather resolve with final ETAs. With no slowdowns or rest
+    # stops the ETAs are unchanged, and so is step 2's weather.
+    first_pass = weather_data if final_etas == initial_etas else None
     weather_data, road_data, alerts_by_segment, chain_controls, sources = \
-        resolve_weather_for_etas(raw_weather, waypoints, final_etas)
+        resolve_weather_for_etas(raw_weather, waypoints, final_etas, weather_data=first_pass)
 
-    # 7. Compute final light levels and sun times
+    # 7. Compute final light levels and sun times. Sun times only depend on
+    # the date, so step 3's carry over unless the ETA moved to another day.
     light_levels = []
     sun_times_list = []
     for i, eta in enumerate(final_etas):
-        om = openmeteo_results[i] if i < len(openmeteo_results) and openmeteo_results[i] else None
-        sun = find_sun_times_for_date(om, eta) if om else None
+        if i < len(initial_sun_times) and eta.date() == initial_etas[i].date():
+            sun = initial_sun_times[i]
+        else:
+            si = sun_index[i] if i < len(sun_index) else None
+            sun = find_sun_times_in_index(si, eta) if si else None
         sun_times_list.append(sun)
         light_levels.append(classify_light_level(eta, sun["sunrise"] if sun else None, sun["sunset"] if sun else None))
 
@@ -237,17 +462,17 @@ def build_slot_data(slot_departure, waypoints, route, raw_weather,
 
     # Deduplicate alerts
     all_alerts = []
-    seen = set()
+    by_headline = {}
     for i, seg_alerts in enumerate(alerts_by_segment):
         for alert in seg_alerts:
             key = alert.get("headline", "")
-            if key not in seen:
-                seen.add(key)
-                all_alerts.append({**alert, "affected_segments": [i]})
+            if key not in by_headline:
+                by_headline[key] = len(all_alerts)
+                deduped = alert.copy()
+                deduped["affected_segments"] = [i]
+                all_alerts.append(deduped)
             else:
-                for a in all_alerts:
-                    if a.get("headline") == key:
-                        a["affected_segments"].append(i)
+                all_alerts[by_headline[key]]["affected_segments"].append(i)
 
     return {
         "segments": segments,
@@ -1,12 +1,16 @@
 # rest_stops.py
 """Rest stop computation and Google Places lookup."""
 
+import asyncio
 import aiohttp
+from bisect import bisect_left
 from copy import deepcopy
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from config import GOOGLE_API_KEY
+from config import GOOGLE_API_KEY, PLACES_MAX_CONCURRENCY
+from http_client import json_loads
 from routing import _coords
+from utils import async_ttl_cache
 
 
 def compute_rest_stop_positions(etas, rest_interval_minutes=60):
@@ -17,6 +21,9 @@ def compute_rest_stop_positions(etas, rest_interval_minutes=60):
     Never places a rest stop at the last waypoint (destination).
     Resets cumulative time after each rest stop.
 
+    ETAs along a route never decrease, so each stop is found by bisecting
+    for the first ETA at least rest_interval_minutes after the previous one.
+
     Returns:
         List of waypoint indices (ints).
     """
@@ -26,15 +33,16 @@ def compute_rest_stop_positions(etas, rest_interval_minutes=60):
     rest_interval = timedelta(minutes=rest_interval_minutes)
     positions = []
     last_rest_eta = etas[0]
+    i = 1
 
-    for i in range(1, len(etas)):
-        cumulative_drive = etas[i] - last_rest_eta
-        if cumulative_drive >= rest_interval:
-            # Never place a rest stop at the last waypoint (destination)
-            if i == len(etas) - 1:
-                break
-            positions.append(i)
-            last_rest_eta = etas[i]
+    while True:
+        i = bisect_left(etas, last_rest_eta + rest_interval, i)
+        # Never place a rest stop at the last waypoint (destination)
+        if i >= len(etas) - 1:
+            break
+        positions.append(i)
+        last_rest_eta = etas[i]
+        i += 1
 
     return positions
 
@@ -49,13 +57,14 @@ def apply_rest_stop_delays(etas, rest_indices, rest_duration_minutes=20):
         New list of ETAs (does not modify original).
     """
     delay = timedelta(minutes=0)
+    rest_delta = timedelta(minutes=rest_duration_minutes)
     rest_set = set(rest_indices)
     result = []
 
     for i, eta in enumerate(etas):
         result.append(eta + delay)
         if i in rest_set:
-            delay += timedelta(minutes=rest_duration_minutes)
+            delay += rest_delta
 
     return result
 
@@ -72,18 +81,18 @@ def insert_rest_stop_segments(segments, rest_stop_info, rest_duration_minutes):
     Returns:
         New list of segments with rest stop pseudo-segments inserted.
     """
-    result = list(segments)
-
-    # Insert in reverse index order to avoid shifting issues
-    sorted_info = sorted(rest_stop_info, key=lambda x: x["after_segment_index"], reverse=True)
-
-    for info in sorted_info:
+    # Build each pseudo-segment against the original list, then splice them
+    # all in one pass instead of shifting the list with repeated insert()s
+    last = len(segments) - 1
+    rest_delta = timedelta(minutes=rest_duration_minutes)
+    inserts = {}
+    for info in rest_stop_info:
         idx = info["after_segment_index"]
         place_name = info.get("place_name")
         location = info["location"]
 
         # Get the segment we're inserting after for mile_marker and eta info
-        ref_segment = result[idx] if idx < len(result) else result[-1]
+        ref_segment = segments[idx] if idx < len(segments) else segments[-1]
         mile_marker = ref_segment.get("mile_marker", 0)
         eta_arrive = ref_segment.get("eta", None)
 
@@ -93,12 +102,11 @@ def insert_rest_stop_segments(segments, rest_stop_info, rest_duration_minutes):
         # Compute departure time from the rest stop
         eta_depart = None
         if eta_arrive is not None:
-            from datetime import datetime
             if isinstance(eta_arrive, str):
                 eta_arrive_dt = datetime.fromisoformat(eta_arrive)
             else:
                 eta_arrive_dt = eta_arrive
-            eta_depart = (eta_arrive_dt + timedelta(minutes=rest_duration_minutes)).isoformat()
+            eta_depart = (eta_arrive_dt + rest_delta).isoformat()
             if isinstance(eta_arrive, str):
                 pass  # keep as string
             else:
@@ -114,12 +122,34 @@ def insert_rest_stop_segments(segments, rest_stop_info, rest_duration_minutes):
             "mile_marker": mile_marker,
         }
 
-        # Insert after the indexed segment
-        result.insert(idx + 1, pseudo_segment)
+        # Stops sharing an index come out newest-first, as repeated
+        # insert(idx + 1) would leave them
+        inserts.setdefault(min(idx, last), []).insert(0, pseudo_segment)
+
+    result = []
+    for i, seg in enumerate(segments):
+        result.append(seg)
+        if i in inserts:
+            result.extend(inserts[i])
 
     return result
 
 
+def _rest_stop_cache_key(positions, waypoints, session=None):
+    """Cache Places lookups on the rest stop coordinates."""
+    return tuple((pos, *_coords(waypoints[pos])) for pos in positions)
+
+
+def _all_found(results):
+    """Only cache lookups where every stop got a place.
+
+    _search_nearby returns None both on errors and when nothing is nearby,
+    so a missing place might just be a failed call worth retrying.
+    """
+    return all(r["place_name"] is not None for r in results)
+
+
+@async_ttl_cache(ttl_seconds=3600, key=_rest_stop_cache_key, maxsize=256, cache_if=_all_found)
 async def fetch_rest_stop_places(positions, waypoints, session=None):
     """For each rest stop position, look up a nearby rest stop or gas station.
 
@@ -135,14 +165,19 @@ async def fetch_rest_stop_places(positions, waypoints, session=None):
     if own_session:
         session = aiohttp.ClientSession()
 
+    # Look up every stop concurrently; _search_nearby returns None on failure
+    sem = asyncio.Semaphore(PLACES_MAX_CONCURRENCY)
+
+    async def _bounded_search(lat, lon):
+        async with sem:
+            return await _search_nearby(session, lat, lon)
+
     results = []
     try:
-        for pos in positions:
-            wp = waypoints[pos]
-            lat, lon = _coords(wp)
-
-            place = await _search_nearby(session, lat, lon)
+        points = [_coords(waypoints[pos]) for pos in positions]
+        places = await asyncio.gather(*[_bounded_search(lat, lon) for lat, lon in points])
 
+        for pos, (lat, lon), place in zip(positions, points, places):
             if place:
                 results.append({
                     "after_segment_index": pos,
@@ -197,7 +232,7 @@ async def _search_nearby(session, lat, lon):
 
     try:
         async with session.post(url, json=body, headers=headers) as resp:
-            data = await resp.json()
+            data = await resp.json(loads=json_loads)
 
         places = data.get("places", [])
         if not places:
@@ -1,11 +1,15 @@
 # road_conditions.py
 import re
+import math
 import asyncio
 import aiohttp
-from routing import haversine_miles
+from routing import haversine_miles, MILES_PER_DEG
+from http_client import json_loads
+from utils import async_ttl_cache
 from config import (
     CALTRANS_DISTRICTS, CALTRANS_RWIS_DISTRICTS,
-    CALTRANS_CC_URL, CALTRANS_RWIS_URL, RWIS_MATCH_RADIUS_MILES,
+    CALTRANS_CC_URLS, CALTRANS_RWIS_URLS, RWIS_MATCH_RADIUS_MILES,
+    UPSTREAM_TIMEOUT_SECONDS,
 )
 
 
@@ -23,25 +27,53 @@ def parse_chain_control(entry):
 
 _CC_LEVEL_RANK = {"R1": 1, "R2": 2, "R3": 3}
 
+# Highway numbers in instruction text
+# Matches: I-80, US-50, SR-88, CA-89, Hwy 50, Highway 50, Route 80
+_HW_PATTERN = re.compile(
+    r"(?:I-|US-|SR-|CA-|Hwy\s*|Highway\s*|Route\s*)(\d+)", re.IGNORECASE
+)
+
+
+def build_cc_index(chain_controls):
+    """Map each highway to its most restrictive chain control, for repeated matching.
 
-def match_chain_control_to_instruction(chain_controls, instruction_text):
+    Values are (rank, order, control); order breaks ties in favour of the
+    control listed first, as the linear scan does.
+    """
+    index = {}
+    for order, cc in enumerate(chain_controls):
+        rank = _CC_LEVEL_RANK.get(cc["level"], 0)
+        if rank == 0:
+            continue
+        best = index.get(cc["highway"])
+        if best is None or rank > best[0]:
+            index[cc["highway"]] = (rank, order, cc)
+    return index
+
+
+def match_chain_control_to_instruction(chain_controls, instruction_text, index=None):
     """Match chain controls to a turn instruction by highway name.
 
     Looks for patterns like I-80, US-50, SR-88, CA-89, Hwy 50, etc. in the
     instruction text and returns the most restrictive matching control, or None.
+    If a prebuilt `index` (see build_cc_index) is given, only the instruction's
+    highways are looked up instead of scanning every control.
     """
     if not chain_controls or not instruction_text:
         return None
 
-    # Extract highway numbers from instruction text
-    # Matches: I-80, US-50, SR-88, CA-89, Hwy 50, Highway 50, Route 80
-    hw_pattern = re.compile(
-        r"(?:I-|US-|SR-|CA-|Hwy\s*|Highway\s*|Route\s*)(\d+)", re.IGNORECASE
-    )
-    instruction_highways = set(hw_pattern.findall(instruction_text))
+    instruction_highways = set(_HW_PATTERN.findall(instruction_text))
     if not instruction_highways:
         return None
 
+    if index is not None:
+        best = None
+        for highway in instruction_highways:
+            entry = index.get(highway)
+            if entry is not None and (best is None or (-entry[0], entry[1]) < (-best[0], best[1])):
+                best = entry
+        return best[2] if best is not None else None
+
     best = None
     best_rank = 0
     for cc in chain_controls:
@@ -54,11 +86,65 @@ def match_chain_control_to_instruction(chain_controls, instruction_text):
     return best
 
 
-def match_rwis_to_waypoint(stations, waypoint, radius_miles=None):
-    """Find the nearest RWIS station to a waypoint within radius."""
+def build_rwis_index(stations, cell_miles=None):
+    """Bucket RWIS stations into a lat/lon grid for repeated nearest-station queries.
+
+    Cell size defaults to the match radius, so a query only visits the
+    few cells around the waypoint instead of every station.
+    """
+    if cell_miles is None:
+        cell_miles = RWIS_MATCH_RADIUS_MILES
+    cell_deg = cell_miles / MILES_PER_DEG
+
+    cells = {}
+    for order, station in enumerate(stations):
+        loc = station.get("location", {})
+        slat = loc.get("latitude")
+        slon = loc.get("longitude")
+        if slat is None or slon is None:
+            continue
+        key = (math.floor(slat / cell_deg), math.floor(slon / cell_deg))
+        cells.setdefault(key, []).append((order, station))
+
+    return {"cell_deg": cell_deg, "cells": cells, "stations": stations}
+
+
+def _index_candidates(index, lat, lon, radius_miles):
+    """Stations from grid cells that can lie within radius_miles, in original order."""
+    cell_deg = index["cell_deg"]
+    cells = index["cells"]
+
+    radius_deg = radius_miles / MILES_PER_DEG
+    lat_span = math.ceil(radius_deg / cell_deg)
+    # Longitude degrees shrink toward the poles; size for the poleward edge
+    cos_lat = math.cos(math.radians(min(abs(lat) + radius_deg, 89.0)))
+    lon_span = math.ceil(radius_deg / cos_lat / cell_deg) + 1
+
+    if (2 * lat_span + 1) * (2 * lon_span + 1) >= len(cells):
+        return index["stations"]
+
+    lat_cell = math.floor(lat / cell_deg)
+    lon_cell = math.floor(lon / cell_deg)
+    found = []
+    for dlat in range(-lat_span, lat_span + 1):
+        for dlon in range(-lon_span, lon_span + 1):
+            found.extend(cells.get((lat_cell + dlat, lon_cell + dlon), ()))
+    found.sort(key=lambda entry: entry[0])
+    return [station for _, station in found]
+
+
+def match_rwis_to_waypoint(stations, waypoint, radius_miles=None, index=None):
+    """Find the nearest RWIS station to a waypoint within radius.
+
+    If a prebuilt `index` (see build_rwis_index) is given, only stations in
+    nearby grid cells are checked instead of scanning every station.
+    """
     if radius_miles is None:
         radius_miles = RWIS_MATCH_RADIUS_MILES
 
+    if index is not None:
+        stations = _index_candidates(index, waypoint[0], waypoint[1], radius_miles)
+
     best = None
     best_dist = float("inf")
 
@@ -95,11 +181,12 @@ def match_rwis_to_waypoint(stations, waypoint, radius_miles=None):
 
 async def _fetch_cc_district(session, district):
     """Fetch chain control data for a single district."""
-    url = CALTRANS_CC_URL.format(district=district)
+    url = CALTRANS_CC_URLS[district]
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+        # Per-district deadline: a slow district only drops its own controls
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=UPSTREAM_TIMEOUT_SECONDS)) as resp:
             if resp.status == 200:
-                data = await resp.json()
+                data = await resp.json(loads=json_loads)
                 entries = data if isinstance(data, list) else data.get("data", [])
                 return [parse_chain_control(e) for e in entries if parse_chain_control(e)["level"]]
     except Exception:
@@ -107,8 +194,19 @@ async def _fetch_cc_district(session, district):
     return []
 
 
+def _cc_cache_key(session=None):
+    return "chain_controls"
+
+
+@async_ttl_cache(ttl_seconds=60, key=_cc_cache_key, cache_if=bool)
 async def fetch_chain_controls(session=None):
-    """Fetch chain control data from all Caltrans districts in parallel."""
+    """Fetch chain control data from all Caltrans districts in parallel.
+
+    Cached for a minute: controls are statewide, so every route and slider
+    request shares one fetch, but they change quickly during storms. An
+    empty list isn't cached, so an outage across every district doesn't
+    hide chain controls for the whole minute.
+    """
     own_session = session is None
     if own_session:
         session = aiohttp.ClientSession()
@@ -131,19 +229,30 @@ async def fetch_chain_controls(session=None):
 
 async def _fetch_rwis_district(session, district):
     """Fetch RWIS data for a single district."""
-    url = CALTRANS_RWIS_URL.format(district=district)
+    url = CALTRANS_RWIS_URLS[district]
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+        # Same per-district deadline as chain controls
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=UPSTREAM_TIMEOUT_SECONDS)) as resp:
             if resp.status == 200:
-                data = await resp.json()
+                data = await resp.json(loads=json_loads)
                 return data if isinstance(data, list) else data.get("data", [])
     except Exception:
         pass
     return []
 
 
+def _rwis_cache_key(session=None):
+    return "rwis_stations"
+
+
+@async_ttl_cache(ttl_seconds=900, key=_rwis_cache_key, cache_if=bool)
 async def fetch_rwis_stations(session=None):
-    """Fetch RWIS pavement sensor data from Caltrans districts in parallel."""
+    """Fetch RWIS pavement sensor data from Caltrans districts in parallel.
+
+    Cached for 15 minutes: the station list is shared by every route. An
+    empty list means every district failed, so it isn't cached and the
+    next call retries.
+    """
     own_session = session is None
     if own_session:
         session = aiohttp.ClientSession()
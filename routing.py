@@ -1,48 +1,113 @@
 import math
 import aiohttp
-from datetime import datetime, timedelta
-from config import GOOGLE_API_KEY, WAYPOINT_INTERVAL_MILES
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from config import (GOOGLE_API_KEY, WAYPOINT_INTERVAL_MILES, RWIS_SNAP_RADIUS_MILES,
+                    RWIS_MIN_STATION_SPACING_MILES, GAP_FILL_THRESHOLD_MILES)
+from utils import AsyncCache, async_ttl_cache
+from http_client import json_loads
+
+def _decode_polyline_py(encoded):
+    """Fallback pure-Python polyline decoder."""
+    # Indexing bytes yields ints directly, avoiding an ord() call per character
+    data = encoded.encode("ascii")
+    end = len(data)
+    points = []
+    index = 0
+    lat = 0
+    lng = 0
+    while index < end:
+        shift = 0
+        result = 0
+        while True:
+            b = data[index] - 63
+            index += 1
+            result |= (b & 0x1F) << shift
+            shift += 5
+            if b < 0x20:
+                break
+        lat += ~(result >> 1) if (result & 1) else (result >> 1)
+
+        shift = 0
+        result = 0
+        while True:
+            b = data[index] - 63
+            index += 1
+            result |= (b & 0x1F) << shift
+            shift += 5
+            if b < 0x20:
+                break
+        lng += ~(result >> 1) if (result & 1) else (result >> 1)
+
+        points.append((lat / 1e5, lng / 1e5))
+    return points
+
 
 try:
     import polyline as polyline_lib
-    def decode_polyline(encoded):
+    def _decode_polyline(encoded):
         return polyline_lib.decode(encoded)
 except ImportError:
-    def decode_polyline(encoded):
-        """Fallback pure-Python polyline decoder."""
-        points = []
-        index = 0
-        lat = 0
-        lng = 0
-        while index < len(encoded):
-            for var in ('lat', 'lng'):
-                shift = 0
-                result = 0
-                while True:
-                    b = ord(encoded[index]) - 63
-                    index += 1
-                    result |= (b & 0x1F) << shift
-                    shift += 5
-                    if b < 0x20:
-                        break
-                dlat_or_dlng = ~(result >> 1) if (result & 1) else (result >> 1)
-                if var == 'lat':
-                    lat += dlat_or_dlng
-                else:
-                    lng += dlat_or_dlng
-            points.append((lat / 1e5, lng / 1e5))
-        return points
+    _decode_polyline = _decode_polyline_py
+
+
+@lru_cache(maxsize=256)
+def _decode_polyline_cached(encoded):
+    return tuple(_decode_polyline(encoded))
+
+
+def decode_polyline(encoded):
+    """Decode a Google encoded polyline into a list of (lat, lon) tuples.
+
+    Decoding is memoised per polyline string, since cached routes and
+    per-slot requests decode the same polyline repeatedly. Callers get
+    their own list.
+    """
+    return list(_decode_polyline_cached(encoded))
+
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Lower bound on miles per degree of latitude, so grid searches never
+# undershoot their radius.
+MILES_PER_DEG = 69.0
 
 
 def haversine_miles(lat1, lon1, lat2, lon2):
     """Distance between two lat/lon points in miles."""
-    R = 3958.8
+    R = EARTH_RADIUS_MILES
     dlat = math.radians(lat2 - lat1)
     dlon = math.radians(lon2 - lon1)
     a = (math.sin(dlat / 2) ** 2 +
          math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
          math.sin(dlon / 2) ** 2)
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    # asin form of the haversine: one sqrt and no atan2; clamp guards
+    # against rounding pushing a just past 1 for antipodal points
+    return R * 2 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _cumulative_miles(points):
+    """Cumulative haversine miles along a polyline at each point, starting at 0.0.
+
+    Same arithmetic as haversine_miles, but each point's cos(lat) is
+    computed once and shared by the two legs that meet there.
+    """
+    R = EARTH_RADIUS_MILES
+    cos_lats = [math.cos(math.radians(pt[0])) for pt in points]
+    cumulative = [0.0]
+    total = 0.0
+    for i in range(1, len(points)):
+        lat1, lon1 = points[i-1][0], points[i-1][1]
+        lat2, lon2 = points[i][0], points[i][1]
+        dlat = math.radians(lat2 - lat1)
+        dlon = math.radians(lon2 - lon1)
+        a = (math.sin(dlat / 2) ** 2 +
+             cos_lats[i-1] * cos_lats[i] *
+             math.sin(dlon / 2) ** 2)
+        total += R * 2 * math.asin(math.sqrt(min(a, 1.0)))
+        cumulative.append(total)
+    return cumulative
 
 
 def find_closest_polyline_point(points, lat, lon):
@@ -52,38 +117,101 @@ def find_closest_polyline_point(points, lat, lon):
     distance_from_route_miles: straight-line distance from (lat, lon) to nearest polyline point.
     along_route_miles: cumulative distance along the polyline to that nearest point.
     """
-    best_dist = float("inf")
-    best_along = 0.0
-    cumulative = 0.0
-
+    if not points:
+        return float("inf"), 0.0
+
+    # Compare the haversine term rather than full distances: distance is
+    # monotonic in it, so only the winning point pays for asin/sqrt
+    cos_lat = math.cos(math.radians(lat))
+    best_a = float("inf")
+    best_idx = 0
     for i, pt in enumerate(points):
-        if i > 0:
-            cumulative += haversine_miles(points[i-1][0], points[i-1][1], pt[0], pt[1])
-        d = haversine_miles(pt[0], pt[1], lat, lon)
-        if d < best_dist:
-            best_dist = d
-            best_along = cumulative
+        dlat = math.radians(lat - pt[0])
+        dlon = math.radians(lon - pt[1])
+        a = (math.sin(dlat / 2) ** 2 +
+             math.cos(math.radians(pt[0])) * cos_lat *
+             math.sin(dlon / 2) ** 2)
+        if a < best_a:
+            best_a = a
+            best_idx = i
+
+    # Only the legs up to the winner are needed for its along-route miles
+    best = points[best_idx]
+    along_route = _cumulative_miles(points[:best_idx + 1])[-1]
+    return haversine_miles(best[0], best[1], lat, lon), along_route
+
+
+def _polyline_grid(points, cell_deg):
+    """Bucket polyline points into a lat/lon grid of cell_deg cells.
+
+    Each cell holds (index, lat, lon, cos(lat)) entries, so lookups don't
+    redo the per-point trig for every station.
+    """
+    cells = {}
+    for i, pt in enumerate(points):
+        key = (math.floor(pt[0] / cell_deg), math.floor(pt[1] / cell_deg))
+        cells.setdefault(key, []).append((i, pt[0], pt[1], math.cos(math.radians(pt[0]))))
+    return cells
+
 
-    return best_dist, best_along
+def _closest_point_within(points, grid, cell_deg, lat, lon, radius_miles):
+    """Closest polyline point to (lat, lon), searching only grid cells within radius_miles.
+
+    Returns (index, distance_miles), or (None, inf) if no point is close
+    enough to be found. Within the radius this matches a full scan,
+    including the first-index tie break.
+    """
+    radius_deg = radius_miles / MILES_PER_DEG
+    lat_span = math.ceil(radius_deg / cell_deg)
+    # Longitude degrees shrink toward the poles; size for the poleward edge
+    cos_lat = math.cos(math.radians(min(abs(lat) + radius_deg, 89.0)))
+    lon_span = math.ceil(radius_deg / cos_lat / cell_deg) + 1
+
+    cos_lat_q = math.cos(math.radians(lat))
+    lat_cell = math.floor(lat / cell_deg)
+    lon_cell = math.floor(lon / cell_deg)
+    candidates = []
+    for dlat in range(-lat_span, lat_span + 1):
+        for dlon in range(-lon_span, lon_span + 1):
+            candidates.extend(grid.get((lat_cell + dlat, lon_cell + dlon), ()))
+    candidates.sort()
+
+    # Same haversine-term comparison as find_closest_polyline_point
+    best_idx = None
+    best_a = float("inf")
+    for i, plat, plon, cos_plat in candidates:
+        dlat = math.radians(lat - plat)
+        dlon = math.radians(lon - plon)
+        a = (math.sin(dlat / 2) ** 2 +
+             cos_plat * cos_lat_q *
+             math.sin(dlon / 2) ** 2)
+        if a < best_a:
+            best_a = a
+            best_idx = i
+    if best_idx is None:
+        return None, float("inf")
+    return best_idx, haversine_miles(points[best_idx][0], points[best_idx][1], lat, lon)
 
 
 def sample_waypoints(points, interval_miles=None):
-    """Sample waypoints from a decoded polyline at regular distance intervals."""
+    """Sample waypoints from a decoded polyline at regular distance intervals.
+
+    Each sample is the first point at least interval_miles past the previous
+    one, found by bisecting the route's cumulative distances.
+    """
     if interval_miles is None:
         interval_miles = WAYPOINT_INTERVAL_MILES
     if len(points) <= 2:
         return list(points)
 
+    cumulative = _cumulative_miles(points)
     sampled = [points[0]]
-    accumulated = 0.0
-
-    for i in range(1, len(points)):
-        d = haversine_miles(points[i-1][0], points[i-1][1],
-                           points[i][0], points[i][1])
-        accumulated += d
-        if accumulated >= interval_miles:
-            sampled.append(points[i])
-            accumulated = 0.0
+    taken = 0
+    while True:
+        taken = bisect_left(cumulative, cumulative[taken] + interval_miles, taken + 1)
+        if taken >= len(points):
+            break
+        sampled.append(points[taken])
 
     if sampled[-1] != points[-1]:
         sampled.append(points[-1])
@@ -108,8 +236,6 @@ def build_station_aware_waypoints(points, rwis_stations,
         List of dicts: {"lat": float, "lon": float, "type": "rwis"|"fill",
                         "station": <station dict>|None, "along_route_miles": float}
     """
-    from config import (RWIS_SNAP_RADIUS_MILES, RWIS_MIN_STATION_SPACING_MILES,
-                        GAP_FILL_THRESHOLD_MILES, WAYPOINT_INTERVAL_MILES)
     if snap_radius is None:
         snap_radius = RWIS_SNAP_RADIUS_MILES
     if min_spacing is None:
@@ -124,13 +250,13 @@ def build_station_aware_waypoints(points, rwis_stations,
                  "station": None, "along_route_miles": 0.0}]
 
     # Compute total route length
-    cumulative_dists = [0.0]
-    for i in range(1, len(points)):
-        d = haversine_miles(points[i-1][0], points[i-1][1], points[i][0], points[i][1])
-        cumulative_dists.append(cumulative_dists[-1] + d)
+    cumulative_dists = _cumulative_miles(points)
     total_route_miles = cumulative_dists[-1]
 
-    # Match stations to route
+    # Match stations to route. Only polyline points within snap_radius
+    # matter, so each station checks nearby grid cells, not every point.
+    cell_deg = max(snap_radius, 1.0) / MILES_PER_DEG
+    grid = _polyline_grid(points, cell_deg)
     candidates = []
     for station in rwis_stations:
         loc = station.get("location", {})
@@ -138,13 +264,13 @@ def build_station_aware_waypoints(points, rwis_stations,
         slon = loc.get("longitude")
         if slat is None or slon is None:
             continue
-        dist_from_route, along_miles = find_closest_polyline_point(points, slat, slon)
-        if dist_from_route <= snap_radius:
+        closest, dist_from_route = _closest_point_within(points, grid, cell_deg, slat, slon, snap_radius)
+        if closest is not None and dist_from_route <= snap_radius:
             candidates.append({
                 "station": station,
                 "lat": slat,
                 "lon": slon,
-                "along_route_miles": along_miles,
+                "along_route_miles": cumulative_dists[closest],
                 "dist_from_route": dist_from_route,
             })
 
@@ -178,11 +304,10 @@ def build_station_aware_waypoints(points, rwis_stations,
     # Destination
     dest = {"lat": points[-1][0], "lon": points[-1][1], "type": "fill",
             "station": None, "along_route_miles": total_route_miles}
+    # Stations are already in along-route order between origin (0) and
+    # destination (total), so result is sorted without a sort pass
     result.append(dest)
 
-    # Sort everything by along_route_miles
-    result.sort(key=lambda w: w["along_route_miles"])
-
     # Fill gaps
     filled = []
     for i, wp in enumerate(result):
@@ -203,17 +328,37 @@ def build_station_aware_waypoints(points, rwis_stations,
                         "station": None, "along_route_miles": target_miles,
                     })
 
-    # Re-sort after filling
-    filled.sort(key=lambda w: w["along_route_miles"])
+    # Fills are appended in increasing order strictly between their two
+    # neighbours, so filled stays sorted too
     return filled
 
 
+_route_waypoints_cache = AsyncCache(ttl_seconds=900, maxsize=256)
+
+
+def route_waypoints(encoded_polyline, rwis_stations):
+    """Decode a route polyline and build its station-aware waypoints, memoised.
+
+    Keyed on the polyline and the identity of the station list (which is
+    itself TTL-cached), so repeat requests for a route skip the rebuild.
+    The returned list is shared between callers; treat it as read-only.
+    """
+    key = (encoded_polyline, id(rwis_stations))
+    cached = _route_waypoints_cache.get(key)
+    if cached is not None and cached[0] is rwis_stations:
+        return cached[1]
+
+    waypoints = build_station_aware_waypoints(decode_polyline(encoded_polyline), rwis_stations)
+    # Hold the station list so its id can't be reused while the entry lives
+    _route_waypoints_cache.set(key, (rwis_stations, waypoints))
+    return waypoints
+
+
 def _interpolate_along_route(points, cumulative_dists, target_miles):
     """Find the polyline point at a given distance along the route."""
-    for i in range(1, len(points)):
-        if cumulative_dists[i] >= target_miles:
-            return points[i]
-    return points[-1]
+    # First point past the origin at or beyond target_miles; distances never decrease
+    i = bisect_left(cumulative_dists, target_miles, 1, len(points))
+    return points[i] if i < len(points) else points[-1]
 
 
 def _coords(wp):
@@ -223,29 +368,60 @@ def _coords(wp):
     return wp[0], wp[1]
 
 
-def compute_etas(waypoints, total_duration_seconds, departure):
-    """Compute ETA at each waypoint assuming constant speed along the route."""
-    if len(waypoints) <= 1:
-        return [departure]
+@lru_cache(maxsize=256)
+def _segment_distances(coords):
+    # Repeated points (e.g. a station snapped onto a fill point) are 0 miles apart
+    return tuple(
+        0.0 if p1 == p2 else haversine_miles(p1[0], p1[1], p2[0], p2[1])
+        for p1, p2 in zip(coords, coords[1:])
+    )
+
+
+def segment_distances(waypoints):
+    """Haversine miles between consecutive waypoints.
 
+    Memoised per route: every slider slot computes ETAs over the same
+    waypoints, so the distances only need computing once.
+    """
+    return _segment_distances(tuple(_coords(wp) for wp in waypoints))
+
+
+@lru_cache(maxsize=256)
+def _eta_fractions(seg_distances):
+    """Share of the route's distance covered at each waypoint (None if zero-length).
+
+    Slots differ only by departure, so compute_etas reuses these and just
+    scales them by duration and shifts them by departure.
+    """
     distances = [0.0]
-    for i in range(1, len(waypoints)):
-        lat1, lon1 = _coords(waypoints[i-1])
-        lat2, lon2 = _coords(waypoints[i])
-        d = haversine_miles(lat1, lon1, lat2, lon2)
+    for d in seg_distances:
         distances.append(distances[-1] + d)
-
     total_distance = distances[-1]
     if total_distance == 0:
-        return [departure] * len(waypoints)
+        return None
+    return tuple(d / total_distance for d in distances)
 
-    etas = []
-    for d in distances:
-        fraction = d / total_distance
-        eta = departure + timedelta(seconds=total_duration_seconds * fraction)
-        etas.append(eta)
 
-    return etas
+@lru_cache(maxsize=256)
+def _segment_fractions(seg_distances):
+    """Share of the route's distance in each segment (None if zero-length)."""
+    total_distance = sum(seg_distances)
+    if total_distance == 0:
+        return None
+    return tuple(d / total_distance for d in seg_distances)
+
+
+def compute_etas(waypoints, total_duration_seconds, departure):
+    """Compute ETA at each waypoint assuming constant speed along the route."""
+    if len(waypoints) <= 1:
+        return [departure]
+
+    fractions = _eta_fractions(segment_distances(waypoints))
+    if fractions is None:
+        return [departure] * len(waypoints)
+
+    return [departure + timedelta(seconds=total_duration_seconds * fraction)
+            for fraction in fractions]
 
 
 def compute_adjusted_etas(waypoints, total_duration_seconds, departure,
@@ -267,19 +443,13 @@ def compute_adjusted_etas(waypoints, total_duration_seconds, departure,
     if len(waypoints) <= 1:
         return [departure]
 
-    # Step 1: Compute segment distances using haversine
-    seg_distances = []
-    for i in range(1, len(waypoints)):
-        lat1, lon1 = _coords(waypoints[i - 1])
-        lat2, lon2 = _coords(waypoints[i])
-        seg_distances.append(haversine_miles(lat1, lon1, lat2, lon2))
-
-    total_distance = sum(seg_distances)
-    if total_distance == 0:
+    # Steps 1-2: Segment distances (memoised per route) give each segment's
+    # share of the base duration
+    seg_fractions = _segment_fractions(segment_distances(waypoints))
+    if seg_fractions is None:
         return [departure] * len(waypoints)
 
-    # Step 2: Compute base_time per segment proportional to distance
-    base_times = [(d / total_distance) * total_duration_seconds for d in seg_distances]
+    base_times = [fraction * total_duration_seconds for fraction in seg_fractions]
 
     # Step 3: Compute adjusted_time per segment
     adjusted_times = []
@@ -299,8 +469,19 @@ def compute_adjusted_etas(waypoints, total_duration_seconds, departure,
     return etas
 
 
-async def fetch_route(origin, destination, departure_time):
-    """Fetch route from Google Routes API."""
+def _route_cache_key(origin, destination, departure_time, session=None):
+    """Cache routes per (origin, destination, departure hour)."""
+    departure_hour = datetime.fromisoformat(departure_time).astimezone(timezone.utc).replace(
+        minute=0, second=0, microsecond=0)
+    return origin.strip().lower(), destination.strip().lower(), departure_hour
+
+
+@async_ttl_cache(ttl_seconds=600, key=_route_cache_key, maxsize=1024)
+async def fetch_route(origin, destination, departure_time, session=None):
+    """Fetch route from Google Routes API.
+
+    Uses the given aiohttp.ClientSession if provided, else a one-off session.
+    """
     url = "https://routes.googleapis.com/directions/v2:computeRoutes"
     headers = {
         "Content-Type": "application/json",
@@ -324,9 +505,16 @@ async def fetch_route(origin, destination, departure_time):
         "routingPreference": "TRAFFIC_AWARE",
     }
 
-    async with aiohttp.ClientSession() as session:
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession()
+
+    try:
         async with session.post(url, json=body, headers=headers) as resp:
-            data = await resp.json()
+            data = await resp.json(loads=json_loads)
+    finally:
+        if own_session:
+            await session.close()
 
     if "error" in data:
         msg = data["error"].get("message", str(data["error"]))
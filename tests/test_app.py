@@ -86,10 +86,12 @@ def test_fetch_raw_weather_accepts_rwis_stations_param():
 
 
 def test_do_work_imports_build_station_aware_waypoints():
-    """The app module should import build_station_aware_waypoints."""
+    """The app builds waypoints through route_waypoints, which uses build_station_aware_waypoints."""
+    import inspect
     import app as app_module
-    source = open(app_module.__file__).read()
-    assert "build_station_aware_waypoints" in source
+    import routing
+    assert app_module.route_waypoints is routing.route_waypoints
+    assert "build_station_aware_waypoints" in inspect.getsource(routing.route_waypoints)
 
 
 def test_resolve_weather_uses_station_tag():
@@ -124,3 +126,483 @@ def test_resolve_weather_uses_station_tag():
     weather_data, road_data, alerts_by_segment, cc, sources = resolve_weather_for_etas(raw, waypoints, etas)
     assert road_data[0] is not None
     assert road_data[0]["pavement_status"] == "Wet"
+
+
+def test_build_slot_data_deduplicates_alerts_by_headline():
+    """Alerts shared by several segments are merged with all affected indices."""
+    from app import build_slot_data
+
+    alert = {"headline": "Wind Advisory", "severity": "moderate", "expires": None}
+    other = {"headline": "Flood Watch", "severity": "moderate", "expires": None}
+    waypoints = [(37.0, -122.0), (37.2, -122.0), (37.4, -122.0)]
+    route = {"total_duration_seconds": 3600, "steps": []}
+    raw = {
+        "openmeteo": [None, None, None],
+        "nws": [None, None, None],
+        "nws_alerts": [[alert], [alert, other], [alert]],
+        "tomorrow": [[], [], []],
+        "chain_controls": [],
+        "rwis_stations": [],
+        "sources": [],
+    }
+    departure = datetime(2026, 2, 21, 8, 0, tzinfo=timezone.utc)
+
+    result = build_slot_data(departure, waypoints, route, raw)
+
+    assert [a["headline"] for a in result["alerts"]] == ["Wind Advisory", "Flood Watch"]
+    assert result["alerts"][0]["affected_segments"] == [0, 1, 2]
+    assert result["alerts"][1]["affected_segments"] == [1]
+
+
+def test_route_weather_missing_params_returns_json_error():
+    """Error responses are serialised by the app's JSON provider."""
+    import json
+    from app import app
+    resp = app.test_client().get("/api/route-weather")
+    assert resp.status_code == 400
+    assert resp.mimetype == "application/json"
+    assert "Missing required params" in json.loads(resp.data)["error"]
+
+
+def test_compress_response_gzips_large_json():
+    """Large JSON bodies are gzipped when the client accepts gzip."""
+    import gzip
+    import json
+    from flask import jsonify
+    from app import app, compress_response
+
+    payload = {"slots": {str(i): {"segments": ["clear"] * 20} for i in range(50)}}
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        resp = compress_response(jsonify(payload))
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(resp.get_data())) == payload
+
+    with app.test_request_context():
+        resp = compress_response(jsonify(payload))
+        assert "Content-Encoding" not in resp.headers
+
+
+def test_route_weather_slot_requires_slot_param():
+    import json
+    from app import app
+    departure = (datetime.now(tz=timezone.utc) + timedelta(hours=2)).isoformat()
+    resp = app.test_client().get("/api/route-weather/slot", query_string={
+        "origin": "A", "destination": "B", "departure": departure,
+    })
+    assert resp.status_code == 400
+    assert json.loads(resp.data)["error"] == "Missing required param: slot"
+
+
+def test_with_timeout_returns_fallback_for_slow_or_failing_upstream():
+    import asyncio
+    from planner import _with_timeout
+
+    async def slow():
+        await asyncio.sleep(1)
+        return "late"
+
+    async def boom():
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        return "data"
+
+    async def run():
+        return await asyncio.gather(
+            _with_timeout(slow(), None, timeout=0.01),
+            _with_timeout(boom(), []),
+            _with_timeout(ok(), None),
+        )
+
+    assert asyncio.run(run()) == [None, [], "data"]
+
+
+def test_with_timeout_semaphore_bounds_concurrency():
+    import asyncio
+    from planner import _with_timeout
+    in_flight = []
+    peak = []
+
+    async def fetch():
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return "ok"
+
+    async def run():
+        sem = asyncio.Semaphore(3)
+        return await asyncio.gather(*(_with_timeout(fetch(), None, semaphore=sem) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["ok"] * 10
+    assert max(peak) == 3
+
+
+def test_fetch_raw_weather_fetches_each_nws_cell_once(monkeypatch):
+    import asyncio
+    import planner
+    calls = []
+
+    async def fake_forecast(lat, lon, session=None):
+        calls.append((lat, lon))
+        return [{"startTime": "2026-02-20T08:00:00-08:00", "cell": (round(lat, 2), round(lon, 2))}]
+
+    async def fake_alerts(lat, lon, session=None):
+        return []
+
+    async def fake_openmeteo(lats, lons, session=None):
+        return [None] * len(lats)
+
+    async def fake_empty(*args, **kwargs):
+        return []
+
+    monkeypatch.setattr(planner, "fetch_nws_forecast", fake_forecast)
+    monkeypatch.setattr(planner, "fetch_nws_alerts", fake_alerts)
+    monkeypatch.setattr(planner, "fetch_openmeteo", fake_openmeteo)
+    monkeypatch.setattr(planner, "fetch_tomorrow", fake_empty)
+    monkeypatch.setattr(planner, "fetch_chain_controls", fake_empty)
+
+    waypoints = [(41.001, -121.001), (41.002, -121.002), (41.5, -121.5), (41.003, -121.001)]
+    raw = asyncio.run(planner.fetch_raw_weather(waypoints, None, rwis_stations=[]))
+
+    assert calls == [(41.001, -121.001), (41.5, -121.5)]
+    assert [p[0]["cell"] for p in raw["nws"]] == [(41.0, -121.0), (41.0, -121.0), (41.5, -121.5), (41.0, -121.0)]
+    # Indexing happens on first use, off the event loop
+    assert "nws_index" not in raw
+    planner.index_raw_weather(raw, waypoints)
+    assert raw["nws_index"][0] is raw["nws_index"][1]
+
+
+def test_compute_slider_range_keeps_wall_clock_hours_across_dst():
+    from zoneinfo import ZoneInfo
+    from app import compute_slider_range
+    pac = ZoneInfo("America/Los_Angeles")
+    departure = datetime(2026, 3, 8, 8, 0, tzinfo=pac)
+    now = datetime(2026, 3, 6, 8, 0, tzinfo=pac)
+
+    slots = compute_slider_range(departure, now)
+
+    assert len(slots) == 97
+    assert [s.hour for s in slots[:3]] == [8, 9, 10]
+    assert slots[-1] == datetime(2026, 3, 10, 8, 0, tzinfo=pac)
+    assert compute_slider_range(departure, now) == slots
+
+
+def test_resolve_weather_reuses_merged_weather_across_etas():
+    """ETAs landing in the same forecast period share one merged weather dict."""
+    from app import resolve_weather_for_etas
+    period = {
+        "startTime": "2026-02-21T06:00:00-08:00",
+        "endTime": "2026-02-21T08:00:00-08:00",
+        "temperature": 48,
+        "windSpeed": "10 mph",
+        "shortForecast": "Cloudy",
+    }
+    raw = {
+        "openmeteo": [None],
+        "nws": [[period]],
+        "nws_alerts": [[]],
+        "tomorrow": [[]],
+        "chain_controls": [],
+        "rwis_stations": [],
+        "sources": [],
+    }
+    waypoints = [(38.0, -122.0)]
+    pst = timezone(timedelta(hours=-8))
+
+    first, _, _, _, _ = resolve_weather_for_etas(raw, waypoints, [datetime(2026, 2, 21, 6, 10, tzinfo=pst)])
+    second, _, _, _, _ = resolve_weather_for_etas(raw, waypoints, [datetime(2026, 2, 21, 7, 40, tzinfo=pst)])
+
+    assert first[0]["temperature_f"] == 48
+    assert first[0] is second[0]
+
+
+def test_compress_response_prefers_brotli():
+    import json
+    import pytest
+    brotli = pytest.importorskip("brotli")
+    from flask import jsonify
+    from app import app, compress_response
+
+    payload = {"segments": [{"weather": "clear", "index": i} for i in range(200)]}
+    with app.test_request_context(headers={"Accept-Encoding": "gzip, br"}):
+        resp = compress_response(jsonify(payload))
+        assert resp.headers["Content-Encoding"] == "br"
+        assert json.loads(brotli.decompress(resp.get_data())) == payload
+
+
+def test_fetch_raw_weather_fetches_each_tomorrow_cell_once(monkeypatch):
+    import asyncio
+    import planner
+    calls = []
+
+    async def fake_tomorrow(lat, lon, session=None):
+        calls.append((lat, lon))
+        return [{"startTime": "2026-02-20T16:00:00Z", "values": {}}]
+
+    async def fake_openmeteo(lats, lons, session=None):
+        return [None] * len(lats)
+
+    async def fake_none(*args, **kwargs):
+        return None
+
+    async def fake_empty(*args, **kwargs):
+        return []
+
+    monkeypatch.setattr(planner, "fetch_nws_forecast", fake_none)
+    monkeypatch.setattr(planner, "fetch_nws_alerts", fake_empty)
+    monkeypatch.setattr(planner, "fetch_openmeteo", fake_openmeteo)
+    monkeypatch.setattr(planner, "fetch_tomorrow", fake_tomorrow)
+    monkeypatch.setattr(planner, "fetch_chain_controls", fake_empty)
+
+    waypoints = [(42.001, -120.001), (42.002, -120.002), (42.5, -120.5)]
+    raw = asyncio.run(planner.fetch_raw_weather(waypoints, None, rwis_stations=[]))
+
+    assert calls == [(42.001, -120.001), (42.5, -120.5)]
+    assert raw["tomorrow"][0] is raw["tomorrow"][1]
+    assert raw["sources"] == ["Tomorrow.io"]
+
+
+def test_compute_slider_range_coarse_thins_out_away_from_departure():
+    from zoneinfo import ZoneInfo
+    from app import compute_slider_range
+    pac = ZoneInfo("America/Los_Angeles")
+    departure = datetime(2026, 2, 20, 8, 0, tzinfo=pac)
+    now = datetime(2026, 2, 19, 20, 30, tzinfo=pac)
+
+    slots = compute_slider_range(departure, now, "coarse")
+    steps = [(b - a).total_seconds() / 60 for a, b in zip(slots, slots[1:])]
+
+    assert slots[0] == datetime(2026, 2, 19, 21, 0, tzinfo=pac)
+    assert slots[-1] == departure + timedelta(hours=48)
+    assert departure in slots
+    assert steps[slots.index(departure)] == 15
+    assert steps[-1] == 180
+    assert len(slots) < len(compute_slider_range(departure, now))
+
+
+def test_fetch_raw_weather_retries_timed_out_source(monkeypatch):
+    """A bundle where a source timed out isn't cached; the next call refetches."""
+    import asyncio
+    import planner
+    openmeteo_calls = []
+
+    async def flaky_openmeteo(lats, lons, session=None):
+        openmeteo_calls.append(len(lats))
+        if len(openmeteo_calls) == 1:
+            await asyncio.sleep(1)
+        return [{"hourly": {"time": []}}] * len(lats)
+
+    async def fake_none(*args, **kwargs):
+        return None
+
+    async def fake_empty(*args, **kwargs):
+        return []
+
+    monkeypatch.setattr(planner, "OPENMETEO_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setattr(planner, "fetch_nws_forecast", fake_none)
+    monkeypatch.setattr(planner, "fetch_nws_alerts", fake_empty)
+    monkeypatch.setattr(planner, "fetch_openmeteo", flaky_openmeteo)
+    monkeypatch.setattr(planner, "fetch_tomorrow", fake_empty)
+    monkeypatch.setattr(planner, "fetch_chain_controls", fake_empty)
+
+    waypoints = [(43.001, -119.001), (43.5, -119.5)]
+    first = asyncio.run(planner.fetch_raw_weather(waypoints, None, rwis_stations=[]))
+    second = asyncio.run(planner.fetch_raw_weather(waypoints, None, rwis_stations=[]))
+    third = asyncio.run(planner.fetch_raw_weather(waypoints, None, rwis_stations=[]))
+
+    assert first["sources"] == [] and first["partial"]
+    assert second["sources"] == ["Open-Meteo"] and not second["partial"]
+    assert third is second
+    assert len(openmeteo_calls) == 2
+
+
+def test_fetch_raw_weather_concurrency_is_bounded_only_by_planner(monkeypatch):
+    """The planner's semaphores are the only limit on in-flight upstream calls.
+
+    The fetchers used to carry their own, smaller limits (NWS 5 under the
+    planner's 8, Tomorrow.io 3 for up to 5 samples), so calls admitted by
+    the planner could sit queued on the inner semaphore while their
+    deadline ran.
+    """
+    import asyncio
+    import planner
+    in_flight = {"nws": 0, "tomorrow": 0}
+    peak = {"nws": 0, "tomorrow": 0}
+
+    class FakeResponse:
+        status = 200
+
+        def __init__(self, host, data):
+            self.host = host
+            self.data = data
+
+        async def __aenter__(self):
+            in_flight[self.host] += 1
+            peak[self.host] = max(peak[self.host], in_flight[self.host])
+            await asyncio.sleep(0.01)
+            in_flight[self.host] -= 1
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def json(self, loads=None):
+            return self.data
+
+    class FakeSession:
+        def get(self, url, **kwargs):
+            if "/points/" in url:
+                return FakeResponse("nws", {"properties": {"forecastHourly": "https://api.weather.gov/gridpoints/x"}})
+            if "/gridpoints/" in url:
+                return FakeResponse("nws", {"properties": {"periods": [{"startTime": "2026-02-20T08:00:00-08:00"}]}})
+            if "/alerts/" in url:
+                return FakeResponse("nws", {"features": []})
+            return FakeResponse("tomorrow", {"data": {"timelines": [{"intervals": [{"startTime": "2026-02-20T16:00:00Z"}]}]}})
+
+    async def fake_openmeteo(lats, lons, session=None):
+        return [None] * len(lats)
+
+    async def fake_empty(*args, **kwargs):
+        return []
+
+    monkeypatch.setattr(planner, "NWS_MAX_CONCURRENCY", 8)
+    monkeypatch.setattr(planner, "TOMORROW_MAX_CONCURRENCY", 5)
+    monkeypatch.setattr(planner, "fetch_openmeteo", fake_openmeteo)
+    monkeypatch.setattr(planner, "fetch_chain_controls", fake_empty)
+
+    waypoints = [(44.0 + i * 0.1, -118.0) for i in range(12)]
+    raw = asyncio.run(planner.fetch_raw_weather(waypoints, FakeSession(), rwis_stations=[]))
+
+    assert all(periods for periods in raw["nws"])
+    assert all(raw["tomorrow"])
+    assert peak == {"nws": 8, "tomorrow": 5}
+
+
+def test_route_weather_coarse_resolution_has_uneven_slots(monkeypatch):
+    """slider_resolution=coarse is API-only and reports step_hours as null."""
+    import json
+    import app as app_module
+
+    raw = {
+        "openmeteo": [None, None],
+        "nws": [None, None],
+        "nws_alerts": [[], []],
+        "tomorrow": [[], []],
+        "chain_controls": [],
+        "rwis_stations": [],
+        "sources": [],
+    }
+    route = {"summary": "I-80", "total_distance_meters": 16093.44, "total_duration_seconds": 3600,
+             "polyline": "", "steps": []}
+
+    def fake_prepare_trip(trip):
+        return route, [(37.0, -122.0), (37.2, -122.0)], raw, None
+
+    monkeypatch.setattr(app_module, "prepare_trip", fake_prepare_trip)
+    departure = (datetime.now(tz=timezone.utc) + timedelta(hours=6)).replace(minute=0, second=0, microsecond=0)
+    client = app_module.app.test_client()
+
+    resp = client.get("/api/route-weather", query_string={
+        "origin": "A", "destination": "B", "departure": departure.isoformat(),
+        "slider_resolution": "coarse",
+    })
+    assert resp.status_code == 200
+    body = json.loads(resp.data)
+    assert "slots" not in body
+    slider = body["slider_range"]
+    assert slider["step_hours"] is None
+    slots = [datetime.fromisoformat(s) for s in slider["slots"]]
+    steps = {b - a for a, b in zip(slots, slots[1:])}
+    assert timedelta(minutes=15) in steps and timedelta(hours=3) in steps
+
+    resp = client.get("/api/route-weather", query_string={
+        "origin": "A", "destination": "B", "departure": departure.isoformat(),
+        "slider_resolution": "weekly",
+    })
+    assert resp.status_code == 400
+
+
+def test_route_weather_slot_works_after_trip_departure_passes(monkeypatch):
+    """Slots stay valid once the chosen departure is in the past; off-schedule slots are rejected."""
+    import json
+    import app as app_module
+
+    raw = {
+        "openmeteo": [None, None],
+        "nws": [None, None],
+        "nws_alerts": [[], []],
+        "tomorrow": [[], []],
+        "chain_controls": [],
+        "rwis_stations": [],
+        "sources": [],
+    }
+    route = {"summary": "I-80", "total_distance_meters": 16093.44, "total_duration_seconds": 3600,
+             "polyline": "", "steps": []}
+
+    def fake_prepare_trip(trip):
+        return route, [(37.0, -122.0), (37.2, -122.0)], raw, None
+
+    monkeypatch.setattr(app_module, "prepare_trip", fake_prepare_trip)
+    departure = (datetime.now(tz=timezone.utc) - timedelta(hours=3)).replace(minute=0, second=0, microsecond=0)
+    client = app_module.app.test_client()
+    trip = {"origin": "A", "destination": "B", "departure": departure.isoformat()}
+
+    resp = client.get("/api/route-weather", query_string=trip)
+    assert resp.status_code == 400
+    assert json.loads(resp.data)["error"] == "Departure time must be in the future."
+
+    slot = departure + timedelta(hours=1)
+    resp = client.get("/api/route-weather/slot", query_string=dict(trip, slot=slot.isoformat()))
+    assert resp.status_code == 200
+    assert json.loads(resp.data)["departure"] == slot.isoformat()
+
+    off_schedule = departure + timedelta(minutes=20)
+    resp = client.get("/api/route-weather/slot", query_string=dict(trip, slot=off_schedule.isoformat()))
+    assert resp.status_code == 400
+    assert json.loads(resp.data)["error"] == "slot must be one of the slider_range slots"
+
+
+def test_prepare_trip_keeps_cpu_work_off_the_shared_loop(monkeypatch):
+    """Only upstream fetches run on the async loop; waypoints and indexing run on the caller's thread."""
+    import threading
+    import app as app_module
+    import planner
+    threads = {}
+
+    async def fake_fetch_route(origin, destination, departure_time, session=None):
+        threads["fetch_route"] = threading.current_thread().name
+        return {"polyline": "poly", "total_duration_seconds": 3600}
+
+    async def fake_fetch_rwis_stations(session=None):
+        return []
+
+    async def fake_fetch_raw_weather(waypoints, session, rwis_stations=None):
+        threads["fetch_raw_weather"] = threading.current_thread().name
+        return {"openmeteo": [None, None], "nws": [None, None], "nws_alerts": [[], []],
+                "tomorrow": [[], []], "chain_controls": [], "rwis_stations": [], "sources": []}
+
+    def fake_route_waypoints(encoded_polyline, rwis_stations):
+        threads["route_waypoints"] = threading.current_thread().name
+        return [(37.0, -122.0), (37.2, -122.0)]
+
+    real_index = planner.index_raw_weather
+
+    def recording_index(raw, waypoints):
+        threads["index_raw_weather"] = threading.current_thread().name
+        return real_index(raw, waypoints)
+
+    monkeypatch.setattr(app_module, "fetch_route", fake_fetch_route)
+    monkeypatch.setattr(app_module, "fetch_rwis_stations", fake_fetch_rwis_stations)
+    monkeypatch.setattr(app_module, "fetch_raw_weather", fake_fetch_raw_weather)
+    monkeypatch.setattr(app_module, "route_waypoints", fake_route_waypoints)
+    monkeypatch.setattr(planner, "index_raw_weather", recording_index)
+
+    trip = {"origin": "A", "destination": "B", "speed_factor": 1.0, "rest_enabled": True,
+            "rest_interval": 30, "departure": datetime(2026, 2, 21, 8, 0, tzinfo=timezone.utc)}
+    route, waypoints, raw, rest_stop_info = app_module.prepare_trip(trip)
+
+    caller = threading.current_thread().name
+    assert threads["fetch_route"] == threads["fetch_raw_weather"] == "async-loop"
+    assert threads["route_waypoints"] == threads["index_raw_weather"] == caller
+    assert "nws_index" in raw
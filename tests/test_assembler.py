@@ -13,6 +13,20 @@ def test_merge_weather_averages_temperature():
     assert merged["condition_text"] == "Cloudy"
     assert merged["road_risk_score"] == 2
 
+def test_merge_weather_treats_none_fields_as_zero():
+    nws = {"temperature_f": 48, "precipitation_probability": None, "wind_speed_mph": None}
+    openmeteo = {"temperature_f": 49, "wind_speed_mph": 12, "wind_gusts_mph": None}
+    tomorrow = {"temperature_f": 47, "precipitation_probability": 30, "wind_speed_mph": None}
+
+    merged = merge_weather(nws=nws, openmeteo=openmeteo, tomorrow=tomorrow)
+    assert merged["wind_speed_mph"] == 12
+    assert merged["wind_gusts_mph"] == 12
+    assert merged["precipitation_probability"] == 30
+
+    merged = merge_weather(nws=nws)
+    assert merged["wind_speed_mph"] == 0
+    assert merged["precipitation_probability"] == 0
+
 def test_compute_severity_green():
     weather = {"visibility_miles": 10, "wind_speed_mph": 10, "wind_gusts_mph": 15, "precipitation_mm_hr": 0.0}
     score, label = compute_severity(weather, road_conditions=None, alerts=[])
@@ -40,6 +54,29 @@ def test_classify_fog_level():
     assert classify_fog_level(3.0) == "patchy"
     assert classify_fog_level(0.5) == "dense"
 
+def test_compute_severity_pavement_status_case_insensitive():
+    assert compute_severity({}, road_conditions={"pavement_status": "Ice"})[0] == 2
+    assert compute_severity({}, road_conditions={"pavement_status": "SNOW"})[0] == 2
+    assert compute_severity({}, road_conditions={"pavement_status": "Dry"})[0] == 0
+
+def test_classify_thresholds_at_boundaries():
+    assert classify_rain_intensity(None) == "none"
+    assert classify_rain_intensity(0.1) == "light"
+    assert classify_rain_intensity(0.5) == "moderate"
+    assert classify_rain_intensity(4.0) == "heavy"
+    assert classify_fog_level(None) == "none"
+    assert classify_fog_level(5.0) == "patchy"
+    assert classify_fog_level(1.0) == "dense"
+
+def test_compute_severity_thresholds_at_boundaries():
+    # Visibility penalises strictly below a threshold; wind/precip strictly above
+    assert compute_severity({"visibility_miles": 5.0})[0] == 0
+    assert compute_severity({"visibility_miles": 4.9})[0] == 1
+    assert compute_severity({"wind_speed_mph": 20})[0] == 0
+    assert compute_severity({"wind_speed_mph": 45.5})[0] == 3
+    assert compute_severity({"precipitation_mm_hr": 0.5})[0] == 0
+    assert compute_severity({"precipitation_mm_hr": 8.1})[0] == 3
+
 
 def test_build_segments_includes_source_links():
     """Each segment should have source_links with NWS and Open-Meteo at minimum."""
@@ -0,0 +1,34 @@
+# tests/test_http_client.py
+import asyncio
+from http_client import get_shared_session, close_shared_session, json_loads
+
+
+def test_shared_session_reused_on_same_loop():
+    """Repeated calls on one event loop return the same session."""
+    async def run():
+        first = await get_shared_session()
+        second = await get_shared_session()
+        same = first is second
+        await close_shared_session()
+        return same
+
+    assert asyncio.run(run()) is True
+
+
+def test_shared_session_recreated_after_close():
+    """A closed session is replaced on the next call."""
+    async def run():
+        first = await get_shared_session()
+        await close_shared_session()
+        second = await get_shared_session()
+        result = first is not second and not second.closed
+        await close_shared_session()
+        return result
+
+    assert asyncio.run(run()) is True
+
+
+def test_json_loads_parses_upstream_bodies():
+    """json_loads is a drop-in for resp.json(loads=...), which passes text."""
+    body = '{"properties": {"periods": [{"temperature": 48}]}}'
+    assert json_loads(body) == {"properties": {"periods": [{"temperature": 48}]}}
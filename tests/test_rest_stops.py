@@ -53,3 +53,48 @@ def test_apply_multiple_rest_stops():
     assert result[2] == etas[2] + timedelta(minutes=20)
     assert result[4] == etas[4] + timedelta(minutes=20)
     assert result[5] == etas[5] + timedelta(minutes=40)
+
+
+def test_fetch_rest_stop_places_keeps_position_order(monkeypatch):
+    import asyncio
+    import rest_stops
+
+    async def fake_search(session, lat, lon):
+        # Later stops answer first; results must still follow positions
+        await asyncio.sleep(0.01 * (3 - lat))
+        if lat == 2:
+            return None
+        return {"name": f"Stop {lat}", "location": {"lat": lat, "lng": lon}}
+
+    monkeypatch.setattr(rest_stops, "_search_nearby", fake_search)
+    waypoints = [(0, -120.5), (1, -120.5), (2, -120.5)]
+    result = asyncio.run(rest_stops.fetch_rest_stop_places([0, 1, 2], waypoints, session=object()))
+
+    assert [r["after_segment_index"] for r in result] == [0, 1, 2]
+    assert [r["place_name"] for r in result] == ["Stop 0", "Stop 1", None]
+    assert result[2]["location"] == {"lat": 2, "lng": -120.5}
+
+
+def test_fetch_rest_stop_places_retries_missing_places(monkeypatch):
+    import asyncio
+    import rest_stops
+    calls = []
+
+    async def fake_search(session, lat, lon):
+        calls.append(lat)
+        # The first lookup for the second stop fails
+        if lat == 11 and calls.count(11) == 1:
+            return None
+        return {"name": f"Stop {lat}", "location": {"lat": lat, "lng": lon}}
+
+    monkeypatch.setattr(rest_stops, "_search_nearby", fake_search)
+    waypoints = [(10, -121.5), (11, -121.5)]
+
+    first = asyncio.run(rest_stops.fetch_rest_stop_places([0, 1], waypoints, session=object()))
+    second = asyncio.run(rest_stops.fetch_rest_stop_places([0, 1], waypoints, session=object()))
+    third = asyncio.run(rest_stops.fetch_rest_stop_places([0, 1], waypoints, session=object()))
+
+    assert [r["place_name"] for r in first] == ["Stop 10", None]
+    assert [r["place_name"] for r in second] == ["Stop 10", "Stop 11"]
+    assert third is second
+    assert len(calls) == 4
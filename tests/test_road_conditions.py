@@ -68,3 +68,70 @@ def test_match_chain_control_most_restrictive():
     result = match_chain_control_to_instruction(controls, "Merge onto I-80")
     assert result is not None
     assert result["level"] == "R3"  # most restrictive
+
+
+def test_match_chain_control_with_index_matches_linear_scan():
+    from road_conditions import build_cc_index
+    controls = [
+        {"highway": "80", "direction": "E", "level": "R2", "description": "R2 on I-80 E"},
+        {"highway": "50", "direction": "E", "level": "R2", "description": "R2 on US-50 E"},
+        {"highway": "80", "direction": "W", "level": "R2", "description": "R2 on I-80 W"},
+        {"highway": "89", "direction": "N", "level": "", "description": "No restriction"},
+    ]
+    index = build_cc_index(controls)
+    for text in ["I-80 to US-50", "US-50 to I-80", "CA-89", "Main St", "Hwy 50"]:
+        assert (match_chain_control_to_instruction(controls, text, index=index)
+                is match_chain_control_to_instruction(controls, text))
+
+
+def test_match_rwis_with_index_matches_linear_scan():
+    from road_conditions import build_rwis_index
+    far_station = {**SAMPLE_RWIS_STATION, "location": {"latitude": 34.0, "longitude": -118.0},
+                   "surfaceStatus": "Dry"}
+    stations = [far_station, SAMPLE_RWIS_STATION]
+    index = build_rwis_index(stations)
+
+    near = match_rwis_to_waypoint(stations, (38.81, -120.04), radius_miles=15, index=index)
+    assert near == match_rwis_to_waypoint(stations, (38.81, -120.04), radius_miles=15)
+    assert near["pavement_status"] == "Wet"
+    assert match_rwis_to_waypoint(stations, (36.0, -121.0), radius_miles=15, index=index) is None
+
+
+def test_fetch_rwis_stations_does_not_cache_all_failed(monkeypatch):
+    import asyncio
+    import road_conditions
+    calls = []
+
+    async def fake_district(session, district):
+        calls.append(district)
+        return [] if len(calls) <= len(road_conditions.CALTRANS_RWIS_DISTRICTS) else [{"district": district}]
+
+    monkeypatch.setattr(road_conditions, "_fetch_rwis_district", fake_district)
+    road_conditions.fetch_rwis_stations.cache.cache.clear()
+
+    assert asyncio.run(road_conditions.fetch_rwis_stations(session=object())) == []
+    stations = asyncio.run(road_conditions.fetch_rwis_stations(session=object()))
+    assert len(stations) == len(road_conditions.CALTRANS_RWIS_DISTRICTS)
+    assert asyncio.run(road_conditions.fetch_rwis_stations(session=object())) is stations
+    road_conditions.fetch_rwis_stations.cache.cache.clear()
+
+
+def test_fetch_chain_controls_does_not_cache_empty(monkeypatch):
+    import asyncio
+    import road_conditions
+    calls = []
+
+    async def fake_district(session, district):
+        calls.append(district)
+        if len(calls) <= len(road_conditions.CALTRANS_DISTRICTS):
+            return []
+        return [{"highway": "80", "level": "R1"}]
+
+    monkeypatch.setattr(road_conditions, "_fetch_cc_district", fake_district)
+    road_conditions.fetch_chain_controls.cache.cache.clear()
+
+    assert asyncio.run(road_conditions.fetch_chain_controls(session=object())) == []
+    controls = asyncio.run(road_conditions.fetch_chain_controls(session=object()))
+    assert len(controls) == len(road_conditions.CALTRANS_DISTRICTS)
+    assert asyncio.run(road_conditions.fetch_chain_controls(session=object())) is controls
+    road_conditions.fetch_chain_controls.cache.cache.clear()
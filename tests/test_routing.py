@@ -1,5 +1,5 @@
 import math
-from routing import decode_polyline, sample_waypoints, compute_etas, compute_adjusted_etas, haversine_miles, find_closest_polyline_point, build_station_aware_waypoints
+from routing import decode_polyline, sample_waypoints, compute_etas, compute_adjusted_etas, segment_distances, haversine_miles, find_closest_polyline_point, build_station_aware_waypoints, route_waypoints
 from datetime import datetime, timezone, timedelta
 
 def test_decode_polyline_basic():
@@ -94,6 +94,28 @@ def test_station_aware_waypoints_with_stations():
     assert rwis_wps[0]["station"]["location"]["locationName"] == "Mid Station"
 
 
+def test_station_aware_waypoints_snap_matches_full_scan():
+    """Grid-limited station snapping agrees with a full nearest-point scan."""
+    points = [(37.0 + i * 0.01, -122.0 + i * 0.015) for i in range(200)]
+    stations = [
+        {"location": {"latitude": 37.5, "longitude": -121.2}},    # ~2 miles off route
+        {"location": {"latitude": 38.1, "longitude": -120.7}},    # ~12 miles off route
+        {"location": {"latitude": 38.15, "longitude": -120.75}},  # ~17 miles, outside snap
+        {"location": {"latitude": 36.5, "longitude": -119.0}},    # far away
+    ]
+    result = build_station_aware_waypoints(points, stations, snap_radius=15, min_spacing=0)
+    rwis_wps = [w for w in result if w["type"] == "rwis"]
+
+    expected = []
+    for st in stations:
+        loc = st["location"]
+        dist, along = find_closest_polyline_point(points, loc["latitude"], loc["longitude"])
+        if dist <= 15:
+            expected.append(along)
+    assert [w["along_route_miles"] for w in rwis_wps] == sorted(expected)
+    assert len(rwis_wps) == 2
+
+
 def test_station_aware_waypoints_no_stations():
     """With no stations, should fall back to 15-mile interval fill waypoints."""
     points = [(37.0, -122.0), (37.5, -122.0), (38.0, -122.0), (38.5, -122.0), (39.0, -122.0)]
@@ -164,3 +186,36 @@ def test_adjusted_etas_per_segment():
     seg2_time = (adjusted[2] - adjusted[1]).total_seconds()
     # Segment 1 should take ~2x segment 2 (same distance but half speed)
     assert seg1_time > seg2_time * 1.8
+
+
+def test_segment_distances_matches_haversine_for_tuples_and_dicts():
+    tuples = [(37.0, -122.0), (37.1, -122.1), (37.3, -122.0)]
+    dicts = [{"lat": lat, "lon": lon} for lat, lon in tuples]
+    expected = (haversine_miles(37.0, -122.0, 37.1, -122.1),
+                haversine_miles(37.1, -122.1, 37.3, -122.0))
+    assert segment_distances(tuples) == expected
+    assert segment_distances(dicts) == expected
+    assert segment_distances(tuples[:1]) == ()
+
+
+def test_decode_polyline_returns_independent_lists():
+    first = decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+    first.append((0.0, 0.0))
+    second = decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+    assert len(second) == 3
+
+
+def test_pure_python_decoder_matches_known_polyline():
+    from routing import _decode_polyline_py
+    points = _decode_polyline_py("_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+    assert points == [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert _decode_polyline_py("") == []
+
+
+def test_route_waypoints_reuses_build_for_same_polyline_and_stations():
+    encoded = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    stations = []
+    first = route_waypoints(encoded, stations)
+    assert route_waypoints(encoded, stations) is first
+    assert route_waypoints(encoded, []) is not first
+    assert first == build_station_aware_waypoints(decode_polyline(encoded), stations)
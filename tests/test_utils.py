@@ -23,3 +23,51 @@ def test_m_to_miles():
 
 def test_m_to_ft():
     assert abs(m_to_ft(1000) - 3281) < 1
+
+
+def test_async_ttl_cache_shares_concurrent_calls():
+    """Concurrent calls with the same key hit the wrapped function once."""
+    import asyncio
+    from utils import async_ttl_cache
+
+    calls = []
+
+    @async_ttl_cache(ttl_seconds=60, key=lambda x: x)
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0)
+        return x * 2
+
+    async def run():
+        return await asyncio.gather(fetch(1), fetch(1), fetch(2))
+
+    assert asyncio.run(run()) == [2, 2, 4]
+    assert calls == [1, 2]
+
+
+def test_async_ttl_cache_skips_results_rejected_by_cache_if():
+    import asyncio
+    from utils import async_ttl_cache
+
+    calls = []
+
+    @async_ttl_cache(ttl_seconds=60, key=lambda: "k", cache_if=bool)
+    async def fetch():
+        calls.append(1)
+        return [] if len(calls) == 1 else ["data"]
+
+    assert asyncio.run(fetch()) == []
+    assert asyncio.run(fetch()) == ["data"]
+    assert asyncio.run(fetch()) == ["data"]
+    assert len(calls) == 2
+
+
+def test_async_cache_maxsize_evicts_oldest():
+    from utils import AsyncCache
+    cache = AsyncCache(ttl_seconds=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
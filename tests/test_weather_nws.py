@@ -43,6 +43,21 @@ def test_find_forecast_fallback_naive_starttime():
     assert result["temperature_f"] == 48
 
 
+def test_find_forecast_in_index_falls_back_to_closest():
+    """Targets outside every period resolve to the closest period by start."""
+    from weather_nws import index_forecast, find_forecast_in_index
+    periods = [
+        {**SAMPLE_PERIOD, "startTime": "2026-02-21T07:00:00-08:00",
+         "endTime": "2026-02-21T08:00:00-08:00", "temperature": 50},
+        {**SAMPLE_PERIOD, "startTime": "2026-02-21T06:00:00-08:00"},
+    ]
+    index = index_forecast(periods)
+    pst = timezone(timedelta(hours=-8))
+    assert find_forecast_in_index(index, datetime(2026, 2, 21, 7, 15, tzinfo=pst))["temperature_f"] == 50
+    assert find_forecast_in_index(index, datetime(2026, 2, 21, 3, 0, tzinfo=pst))["temperature_f"] == 48
+    assert find_forecast_in_index(index, datetime(2026, 2, 21, 11, 0, tzinfo=pst))["temperature_f"] == 50
+
+
 def test_fetch_nws_alerts_includes_expires_and_onset():
     """Alert dicts must include expires and onset fields from NWS properties."""
     from unittest.mock import AsyncMock, MagicMock
@@ -72,3 +72,13 @@ def test_find_sun_times_no_daily():
     """When there is no daily data, return None."""
     result = find_sun_times_for_date(SAMPLE_RESPONSE, datetime(2026, 2, 21, 12, 0))
     assert result is None
+
+
+def test_find_sun_times_in_index_matches_per_call_lookup():
+    from weather_openmeteo import index_sun_times, find_sun_times_in_index
+    pst = timezone(timedelta(hours=-8))
+    index = index_sun_times(SAMPLE_WITH_DAILY)
+    for day in (20, 21, 28):
+        target = datetime(2026, 2, day, 12, 0, tzinfo=pst)
+        assert find_sun_times_in_index(index, target) == find_sun_times_for_date(SAMPLE_WITH_DAILY, target)
+    assert index_sun_times(SAMPLE_RESPONSE) is None
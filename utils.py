@@ -2,12 +2,14 @@
 
 import asyncio
 import time
+from bisect import bisect_left
 from functools import wraps
 
 
 class AsyncCache:
-    def __init__(self, ttl_seconds):
+    def __init__(self, ttl_seconds, maxsize=None):
         self.ttl = ttl_seconds
+        self.maxsize = maxsize
         self.cache = {}
 
     def get(self, key):
@@ -20,6 +22,10 @@ class AsyncCache:
         return None
 
     def set(self, key, value):
+        self.cache.pop(key, None)
+        if self.maxsize is not None and len(self.cache) >= self.maxsize:
+            # Evict the oldest entry (dicts keep insertion order)
+            del self.cache[next(iter(self.cache))]
         self.cache[key] = (value, time.time())
 
 
@@ -27,10 +33,11 @@ def cached_weather_fetcher(ttl_seconds=3600, max_concurrent=5, round_digits=2):
     """
     Decorator for async weather fetchers (lat, lon, session=None).
     Rounds lat/lon for caching purposes to group nearby waypoints.
-    Limits concurrency using a Semaphore.
+    Limits concurrency using a Semaphore; pass max_concurrent=None to
+    leave that to the caller.
     """
     cache = AsyncCache(ttl_seconds)
-    semaphore = asyncio.Semaphore(max_concurrent)
+    semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent is not None else None
 
     def decorator(func):
         @wraps(func)
@@ -40,6 +47,11 @@ def cached_weather_fetcher(ttl_seconds=3600, max_concurrent=5, round_digits=2):
             if cached is not None:
                 return cached
 
+            if semaphore is None:
+                result = await func(lat, lon, session=session, **kwargs)
+                cache.set(key, result)
+                return result
+
             async with semaphore:
                 cached = cache.get(key)
                 if cached is not None:
@@ -52,6 +64,54 @@ def cached_weather_fetcher(ttl_seconds=3600, max_concurrent=5, round_digits=2):
     return decorator
 
 
+def async_ttl_cache(ttl_seconds, key, maxsize=None, cache_if=None):
+    """
+    Decorator caching the result of an async function for ttl_seconds.
+    key(*args, **kwargs) builds the cache key. Concurrent callers with the
+    same key wait on a per-key lock and share a single upstream call.
+    If cache_if is given, results for which cache_if(result) is false are
+    returned but not stored, so the next call retries upstream.
+    """
+    cache = AsyncCache(ttl_seconds, maxsize=maxsize)
+    locks = {}
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            lock = locks.setdefault(cache_key, asyncio.Lock())
+            async with lock:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+                try:
+                    result = await func(*args, **kwargs)
+                finally:
+                    locks.pop(cache_key, None)
+                if cache_if is None or cache_if(result):
+                    cache.set(cache_key, result)
+                return result
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def bisect_closest(values, x):
+    """Index of the entry in sorted `values` closest to x (earliest on ties)."""
+    i = bisect_left(values, x)
+    if i == 0:
+        return 0
+    if i == len(values):
+        return len(values) - 1
+    return i - 1 if x - values[i - 1] <= values[i] - x else i
+
+
 def c_to_f(c):
     return round(c * 9 / 5 + 32, 1)
 
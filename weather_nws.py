@@ -1,8 +1,11 @@
 # weather_nws.py
 import re
 import aiohttp
+from bisect import bisect_right
 from datetime import datetime, timezone
 from config import NWS_USER_AGENT
+from http_client import json_loads
+from utils import bisect_closest
 
 
 def parse_hourly_forecast(period):
@@ -22,40 +25,66 @@ def parse_hourly_forecast(period):
     }
 
 
-def find_forecast_for_time(periods, target_time):
-    """Find the forecast period that contains the target time."""
+def _epoch(iso_str):
+    """Parse an ISO timestamp to epoch seconds, assuming UTC when naive."""
+    t = datetime.fromisoformat(iso_str)
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return t.timestamp()
+
+
+def index_forecast(periods):
+    """Pre-parse period start/end times so repeated lookups can bisect."""
+    rows = []
     for period in periods:
-        start = datetime.fromisoformat(period["startTime"])
-        if start.tzinfo is None:
-            start = start.replace(tzinfo=timezone.utc)
+        start = _epoch(period["startTime"])
         end_str = period.get("endTime")
-        if end_str:
-            end = datetime.fromisoformat(end_str)
-        else:
-            from datetime import timedelta
-            end = start + timedelta(hours=1)
-        if end.tzinfo is None:
-            end = end.replace(tzinfo=timezone.utc)
+        end = _epoch(end_str) if end_str else start + 3600
+        rows.append((start, end, period))
+    rows.sort(key=lambda r: r[0])
+    return {
+        "starts": [r[0] for r in rows],
+        "ends": [r[1] for r in rows],
+        "periods": [r[2] for r in rows],
+        "parsed": {},
+    }
+
 
-        if start <= target_time < end:
-            return parse_hourly_forecast(period)
+def _parsed_period(index, i):
+    """Parse indexed period i once; slider slots keep landing on the same ones."""
+    parsed = index["parsed"].get(i)
+    if parsed is None:
+        # setdefault so concurrent callers all get the same object
+        parsed = index["parsed"].setdefault(i, parse_hourly_forecast(index["periods"][i]))
+    return parsed
+
+
+def find_forecast_in_index(index, target_time):
+    """Find the indexed period containing target_time, else the closest one."""
+    starts = index["starts"]
+    if not starts:
+        return None
+    t = target_time.timestamp()
+
+    i = bisect_right(starts, t) - 1
+    if i >= 0 and t < index["ends"][i]:
+        return _parsed_period(index, i)
 
     # Fallback: return closest period
-    if periods:
-        def _period_diff(p):
-            t = datetime.fromisoformat(p["startTime"])
-            if t.tzinfo is None and target_time.tzinfo is not None:
-                t = t.replace(tzinfo=timezone.utc)
-            return abs((t - target_time).total_seconds())
+    return _parsed_period(index, bisect_closest(starts, t))
 
-        closest = min(periods, key=_period_diff)
-        return parse_hourly_forecast(closest)
-    return None
+
+def find_forecast_for_time(periods, target_time):
+    """Find the forecast period that contains the target time."""
+    return find_forecast_in_index(index_forecast(periods), target_time)
 
 
 from utils import cached_weather_fetcher
 
-@cached_weather_fetcher(ttl_seconds=3600, max_concurrent=5, round_digits=2)
+# No inner concurrency limit: fetch_raw_weather bounds NWS calls with its
+# own semaphore, and a second limit here would queue calls inside their
+# deadline.
+@cached_weather_fetcher(ttl_seconds=3600, max_concurrent=None, round_digits=2)
 async def fetch_nws_forecast(lat, lon, session=None):
     """Fetch hourly forecast from NWS for a lat/lon point.
     Two-step: /points -> /gridpoints forecast/hourly
@@ -71,14 +100,14 @@ async def fetch_nws_forecast(lat, lon, session=None):
         async with session.get(points_url, headers=headers) as resp:
             if resp.status != 200:
                 return None
-            points_data = await resp.json()
+            points_data = await resp.json(loads=json_loads)
 
         forecast_url = points_data["properties"]["forecastHourly"]
 
         async with session.get(forecast_url, headers=headers) as resp:
             if resp.status != 200:
                 return None
-            forecast_data = await resp.json()
+            forecast_data = await resp.json(loads=json_loads)
 
         return forecast_data["properties"]["periods"]
 
@@ -89,7 +118,7 @@ async def fetch_nws_forecast(lat, lon, session=None):
             await session.close()
 
 
-@cached_weather_fetcher(ttl_seconds=3600, max_concurrent=5, round_digits=2)
+@cached_weather_fetcher(ttl_seconds=3600, max_concurrent=None, round_digits=2)
 async def fetch_nws_alerts(lat, lon, session=None):
     """Fetch active weather alerts near a point."""
     headers = {"User-Agent": NWS_USER_AGENT, "Accept": "application/geo+json"}
@@ -102,7 +131,7 @@ async def fetch_nws_alerts(lat, lon, session=None):
         async with session.get(url, headers=headers) as resp:
             if resp.status != 200:
                 return []
-            data = await resp.json()
+            data = await resp.json(loads=json_loads)
 
         alerts = []
         for feature in data.get("features", []):
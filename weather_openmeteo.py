@@ -1,7 +1,8 @@
 # weather_openmeteo.py
 import aiohttp
 from datetime import datetime, timezone, timedelta
-from utils import c_to_f, kmh_to_mph, m_to_miles, m_to_ft
+from http_client import json_loads
+from utils import c_to_f, kmh_to_mph, m_to_miles, m_to_ft, bisect_closest
 
 OPENMETEO_URL = "https://api.open-meteo.com/v1/forecast"
 
@@ -32,29 +33,52 @@ def parse_openmeteo_hourly(data, hour_index):
     }
 
 
-def find_data_for_time(data, target_time):
-    """Find the hourly slot closest to target_time and parse it."""
-    times = data["hourly"]["time"]
-    best_index = 0
-    best_diff = float("inf")
+def index_hourly_times(data):
+    """Pre-parse the hourly time axis so repeated lookups can bisect.
 
-    for i, t_str in enumerate(times):
-        t = datetime.fromisoformat(t_str)
-        if t.tzinfo is None and target_time.tzinfo is not None:
-            t = t.replace(tzinfo=target_time.tzinfo)
-        diff = abs((t - target_time).total_seconds())
-        if diff < best_diff:
-            best_diff = diff
-            best_index = i
+    Open-Meteo times are local wall-clock times, so they are compared
+    against the target's own wall-clock time.
+    """
+    times = [
+        datetime.fromisoformat(t_str).replace(tzinfo=timezone.utc).timestamp()
+        for t_str in data["hourly"]["time"]
+    ]
+    positions = sorted(range(len(times)), key=times.__getitem__)
+    return {
+        "times": [times[i] for i in positions],
+        "positions": positions,
+        "data": data,
+        "parsed": {},
+    }
 
-    return parse_openmeteo_hourly(data, best_index)
 
+def _parsed_hour(index, hour_index):
+    """Parse an hourly slot once; slider slots keep landing on the same ones."""
+    parsed = index["parsed"].get(hour_index)
+    if parsed is None:
+        # setdefault so concurrent callers all get the same object
+        parsed = index["parsed"].setdefault(hour_index, parse_openmeteo_hourly(index["data"], hour_index))
+    return parsed
 
-def find_sun_times_for_date(data, target_time):
-    """Extract sunrise/sunset for the date matching target_time from Open-Meteo daily data.
 
-    Returns {"sunrise": "...", "sunset": "..."} or None if no daily data.
-    Falls back to first day if target date not found.
+def find_data_in_index(index, target_time):
+    """Find the indexed hourly slot closest to target_time and parse it."""
+    times = index["times"]
+    if not times:
+        return _parsed_hour(index, 0)
+    t = target_time.replace(tzinfo=timezone.utc).timestamp()
+    return _parsed_hour(index, index["positions"][bisect_closest(times, t)])
+
+
+def find_data_for_time(data, target_time):
+    """Find the hourly slot closest to target_time and parse it."""
+    return find_data_in_index(index_hourly_times(data), target_time)
+
+
+def index_sun_times(data):
+    """Map each daily date to its sunrise/sunset so repeated lookups are a dict get.
+
+    Returns None if there is no daily data.
     """
     daily = data.get("daily")
     if not daily:
@@ -67,14 +91,30 @@ def find_sun_times_for_date(data, target_time):
     if not dates or not sunrises or not sunsets:
         return None
 
-    target_date_str = target_time.strftime("%Y-%m-%d")
+    by_date = {}
+    for d, sunrise, sunset in zip(dates, sunrises, sunsets):
+        by_date.setdefault(d, {"sunrise": sunrise, "sunset": sunset})
+    return {
+        "by_date": by_date,
+        "first": {"sunrise": sunrises[0], "sunset": sunsets[0]},
+    }
 
-    for i, d in enumerate(dates):
-        if d == target_date_str:
-            return {"sunrise": sunrises[i], "sunset": sunsets[i]}
 
-    # Fallback to first day
-    return {"sunrise": sunrises[0], "sunset": sunsets[0]}
+def find_sun_times_in_index(index, target_time):
+    """Sunrise/sunset for target_time's date, falling back to the first day."""
+    return index["by_date"].get(target_time.strftime("%Y-%m-%d"), index["first"])
+
+
+def find_sun_times_for_date(data, target_time):
+    """Extract sunrise/sunset for the date matching target_time from Open-Meteo daily data.
+
+    Returns {"sunrise": "...", "sunset": "..."} or None if no daily data.
+    Falls back to first day if target date not found.
+    """
+    index = index_sun_times(data)
+    if index is None:
+        return None
+    return find_sun_times_in_index(index, target_time)
 
 
 async def fetch_openmeteo(latitudes, longitudes, forecast_days=7, session=None):
@@ -101,7 +141,7 @@ async def fetch_openmeteo(latitudes, longitudes, forecast_days=7, session=None):
         }
 
         async with session.get(OPENMETEO_URL, params=params) as resp:
-            data = await resp.json()
+            data = await resp.json(loads=json_loads)
 
         if isinstance(data, list):
             return data
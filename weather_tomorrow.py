@@ -2,7 +2,8 @@
 import aiohttp
 from datetime import datetime, timezone, timedelta
 from config import TOMORROW_API_KEY
-from utils import c_to_f, kmh_to_mph, km_to_miles, cached_weather_fetcher
+from http_client import json_loads
+from utils import c_to_f, kmh_to_mph, km_to_miles, cached_weather_fetcher, bisect_closest
 
 TOMORROW_URL = "https://api.tomorrow.io/v4/timelines"
 
@@ -39,26 +40,43 @@ def parse_tomorrow_hourly(interval):
     }
 
 
-def find_data_for_time(intervals, target_time):
-    """Find the interval closest to target_time."""
-    best = None
-    best_diff = float("inf")
-
+def index_intervals(intervals):
+    """Pre-parse interval start times so repeated lookups can bisect."""
+    rows = []
     for interval in intervals:
         t = datetime.fromisoformat(interval["startTime"])
         if t.tzinfo is None:
             t = t.replace(tzinfo=timezone.utc)
-        diff = abs((t - target_time).total_seconds())
-        if diff < best_diff:
-            best_diff = diff
-            best = interval
+        rows.append((t.timestamp(), interval))
+    rows.sort(key=lambda r: r[0])
+    return {
+        "starts": [r[0] for r in rows],
+        "intervals": [r[1] for r in rows],
+        "parsed": {},
+    }
 
-    if best:
-        return parse_tomorrow_hourly(best)
-    return None
+
+def find_data_in_index(index, target_time):
+    """Find the indexed interval closest to target_time."""
+    starts = index["starts"]
+    if not starts:
+        return None
+    i = bisect_closest(starts, target_time.timestamp())
+    # Parse each interval once; slider slots keep landing on the same ones.
+    # setdefault so concurrent callers all get the same object.
+    parsed = index["parsed"].get(i)
+    if parsed is None:
+        parsed = index["parsed"].setdefault(i, parse_tomorrow_hourly(index["intervals"][i]))
+    return parsed
+
+
+def find_data_for_time(intervals, target_time):
+    """Find the interval closest to target_time."""
+    return find_data_in_index(index_intervals(intervals), target_time)
 
 
-@cached_weather_fetcher(ttl_seconds=3600, max_concurrent=3, round_digits=2)
+# Bounded by fetch_raw_weather's TOMORROW_MAX_CONCURRENCY semaphore instead
+@cached_weather_fetcher(ttl_seconds=3600, max_concurrent=None, round_digits=2)
 async def fetch_tomorrow(lat, lon, session=None):
     """Fetch hourly forecast from Tomorrow.io for a single point.
     Returns list of interval dicts.
@@ -80,7 +98,7 @@ async def fetch_tomorrow(lat, lon, session=None):
         }
 
         async with session.get(TOMORROW_URL, params=params) as resp:
-            data = await resp.json()
+            data = await resp.json(loads=json_loads)
 
         timelines = data.get("data", {}).get("timelines", [])
         if timelines: